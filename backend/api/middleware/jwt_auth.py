@@ -7,15 +7,35 @@ from bootstrap.db import get_db
 from fastapi import Depends, HTTPException, status
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordBearer
+from internal.cache import TTLCache
 from internal.respond import respond_http
 from jose import JWTError, jwt
 from models.user import User
 from pydantic import BaseModel, ValidationError
+from sqlalchemy import inspect
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
+# user id -> detached User snapshot; entries are dropped by manage_user on change
+user_cache = TTLCache(
+    max_entries=config.USER_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.USER_CACHE_TTL_SECONDS,
+)
+
+
+def snapshot_user(user: User) -> User:
+    """Copy of the user's column values that is not bound to any session, so it
+    can outlive the request that loaded it."""
+    return User(
+        **{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+    )
+
+
+def invalidate_cached_user(user_id: uuid.UUID):
+    user_cache.pop(user_id)
+
 
 class TokenPayload(BaseModel):
     sub: Optional[str] = None
@@ -34,7 +54,6 @@ async def get_current_user(
 
     try:
         payload = jwt.decode(token, config.SECRET_KEY, algorithms=[config.ALGORITHM])
-        print("Decoded JWT payload:", payload)
 
         token_data = TokenPayload(**payload)
         if token_data.uid is None:
@@ -64,12 +83,16 @@ async def get_current_user(
             detail="Invalid user ID in token",
         )
 
-    stmt = select(User).where(User.id == user_id)
-    result = await db.execute(stmt)
-    user = result.scalars().first()
-
+    user = user_cache.get(user_id)
     if user is None:
-        return credentials_response()
+        stmt = select(User).where(User.id == user_id)
+        result = await db.execute(stmt)
+        user = result.scalars().first()
+
+        if user is None:
+            return credentials_response()
+        user = snapshot_user(user)
+        user_cache.set(user_id, user)
 
     if user.disabled:
         # return JSONResponse(
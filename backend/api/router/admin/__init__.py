@@ -1,7 +1,8 @@
 from fastapi import APIRouter
 
-from . import analysis
+from . import analysis, metrics
 
 router = APIRouter()
 
 router.include_router(analysis.router, prefix="/analysis", tags=["Admin Analysis"])
+router.include_router(metrics.router, prefix="/metrics", tags=["Admin Metrics"])
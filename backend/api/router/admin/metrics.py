@@ -0,0 +1,68 @@
+from fastapi import APIRouter, Depends, status
+
+from api.middleware.jwt_auth import get_current_active_admin, user_cache
+from bootstrap.db import engine, pool_metrics
+from internal.answer_cache import answer_cache
+from internal.embedding_cache import embedding_cache
+from internal.password import password_metrics
+from internal.qdrant_registry import qdrant_registry
+from internal.respond import respond_http
+from internal.retrieval import query_embedding_cache, retrieval_cache
+from models.user import User
+
+router = APIRouter()
+
+
+@router.get(
+    "/caches",
+    status_code=status.HTTP_200_OK,
+    summary="Get hit/miss counters of the in-process caches",
+)
+async def get_cache_metrics(
+    current_admin: User = Depends(get_current_active_admin),
+):
+    return respond_http(
+        status_code=status.HTTP_200_OK,
+        status="success",
+        message="Cache metrics fetched successfully.",
+        data={
+            "embedding_cache": embedding_cache.stats(),
+            "qdrant_collections": qdrant_registry.stats(),
+            "query_embedding_cache": query_embedding_cache.stats(),
+            "retrieval_cache": retrieval_cache.stats(),
+            "answer_cache": answer_cache.stats(),
+            "user_cache": user_cache.stats(),
+        },
+    )
+
+
+@router.get(
+    "/password-hashing",
+    status_code=status.HTTP_200_OK,
+    summary="Get call counts and timings of password hashing / verification",
+)
+async def get_password_hashing_metrics(
+    current_admin: User = Depends(get_current_active_admin),
+):
+    return respond_http(
+        status_code=status.HTTP_200_OK,
+        status="success",
+        message="Password hashing metrics fetched successfully.",
+        data=password_metrics.stats(),
+    )
+
+
+@router.get(
+    "/db-pool",
+    status_code=status.HTTP_200_OK,
+    summary="Get database connection pool usage and checkout wait times",
+)
+async def get_db_pool_metrics(
+    current_admin: User = Depends(get_current_active_admin),
+):
+    return respond_http(
+        status_code=status.HTTP_200_OK,
+        status="success",
+        message="Database pool metrics fetched successfully.",
+        data=pool_metrics.stats(engine.pool),
+    )
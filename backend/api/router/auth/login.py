@@ -7,7 +7,7 @@ from bootstrap.db import get_db
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.responses import JSONResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from internal.password import verify_password
+from internal.password import verify_and_update_password
 from internal.respond import respond_http
 from internal.token import create_access_token, create_refresh_token
 from models.session import Session
@@ -57,18 +57,25 @@ async def login(
     db: AsyncSession = Depends(get_db),
 ):
     print("Login attempt with username:", form_data.username)
-    print("Login attempt with password:", form_data.password)
 
     stmt = select(User).where(User.username == form_data.username)
     result = await db.execute(stmt)
     user = result.scalars().first()
 
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    verified, new_hash = (
+        await verify_and_update_password(form_data.password, user.hashed_password)
+        if user
+        else (False, None)
+    )
+    if not verified:
         return respond_http(
             status_code=status.HTTP_401_UNAUTHORIZED,
             status="error",
             message="Incorrect username or password",
         )
+    if new_hash:
+        # Hashing parameters changed since this hash was made; saved with the session below
+        user.hashed_password = new_hash
 
     if user.disabled:
         return respond_http(
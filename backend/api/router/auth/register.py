@@ -77,7 +77,7 @@ async def register_user(
                 message="Email already registered.",
             )
 
-    hashed_password = get_password_hash(request_data.password)
+    hashed_password = await get_password_hash(request_data.password)
 
     new_user_data = {
         "username": request_data.username,
@@ -87,8 +87,6 @@ async def register_user(
         "user_role": request_data.user_role,
     }
 
-    print(new_user_data) 
-
     new_user = User(**new_user_data)
 
     try:
@@ -1,35 +1,39 @@
+import asyncio
 import os
 import uuid
 from datetime import datetime
-from typing import Optional, List  # Added List
+from typing import Optional
 import json  # Added json for printing the prompt
 
 import load_dotenv
 import openai
 from api.middleware.jwt_auth import get_current_user
-from bootstrap.db import get_db
+from bootstrap.config import config
+from bootstrap.db import AsyncSessionLocal, get_db
+from bootstrap.qdrant import get_qdrant
 from fastapi import APIRouter, Depends, status
+from fastapi.responses import StreamingResponse
+from internal.answer_cache import answer_cache, context_fingerprint
 from internal.respond import respond_http
+from internal.retrieval import embed_query, format_context, retrieve_context
 from models.conversation import Conversation
 from models.message import Message
 from models.user import User
-from models.collection import Collection  # Added Collection import
 from pydantic import BaseModel, Field
+from qdrant_client import AsyncQdrantClient
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
-# Added Qdrant imports
-from qdrant_client import QdrantClient, models as qdrant_models
-from fastapi.concurrency import run_in_threadpool
-
 load_dotenv.load_dotenv()
 
 
 openai.api_key = os.getenv(
     "OPENAI_API_KEY"
 )  # Changed from OPENAI to OPENAI_API_KEY to match collection_manager.py
-QDRANT_URL = os.getenv("QDRANT_URL", "http://qdrant:6333")
-QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+
+CHAT_MODEL = "gpt-4.1-mini"  # Or your desired model
+SYSTEM_PROMPT = "You are an admission chatbot. Use the provided 'Relevant Information' to answer the user's query. If the information is not relevant or not sufficient, answer based on your general knowledge."
+FALLBACK_BOT_MESSAGE = "Sorry, I'm having trouble connecting to my brain right now. Please try again later."
 
 
 class CreateConversationRequest(BaseModel):
@@ -47,174 +51,147 @@ class CreateConversationResponse(BaseModel):
 router = APIRouter()
 
 
-@router.post(
-    "/create",
-    response_model=CreateConversationResponse,
-    status_code=status.HTTP_201_CREATED,
-)
-async def create_conversation(
-    request: CreateConversationRequest,
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
+async def build_prompt_messages(
+    db: AsyncSession, qdrant_client: AsyncQdrantClient, message: str
+) -> tuple[list[dict], str]:
+    """Retrieves RAG context for `message` and builds the chat completion messages.
+    Also returns the retrieved context on its own."""
     # --- Start RAG - Retrieve Context from Qdrant ---
     retrieved_context_str = ""
-    all_relevant_chunks = []  # Store chunks from all active collections
 
-    if QDRANT_URL and openai.api_key:  # Ensure Qdrant and OpenAI are configured
+    if openai.api_key:  # Qdrant is always configured (config.qdrant_url)
         try:
-            qdrant_client = QdrantClient(
-                url=QDRANT_URL, api_key=QDRANT_API_KEY, timeout=10
-            )
-
-            # 1. Get all active collections from the database
-            active_collections_result = await db.execute(
-                select(Collection).where(Collection.is_active == True)
-            )
-            active_collections = active_collections_result.scalars().all()
+            relevant_chunks = await retrieve_context(db, qdrant_client, message)
 
-            if not active_collections:
-                print("No active collections found. Skipping RAG.")
-            else:
+            if relevant_chunks:
+                retrieved_context_str = format_context(relevant_chunks)
                 print(
-                    f"Found {len(active_collections)} active collections. Querying them for context..."
+                    f"Total relevant chunks retrieved from all active collections: {len(relevant_chunks)}"
                 )
-
-                # 2. Get embedding for the user's message (once)
-                query_embedding_response = await openai.Embedding.acreate(
-                    input=[request.message], model="text-embedding-ada-002"
-                )
-                query_vector = query_embedding_response.data[0].embedding
-
-                # 3. Search each active Qdrant collection
-                for collection_model in active_collections:
-                    qdrant_collection_name = (
-                        f"collection_{str(collection_model.id).replace('-', '_')}"
-                    )
-                    print(
-                        f"Attempting to query Qdrant collection: {qdrant_collection_name} for user message: {request.message}"
-                    )
-
-                    try:
-                        # Check if collection exists in Qdrant before searching
-                        try:
-                            collection_info = await run_in_threadpool(
-                                qdrant_client.get_collection,
-                                collection_name=qdrant_collection_name,
-                            )
-                            print(
-                                f"Collection '{qdrant_collection_name}' exists in Qdrant. Points count: {collection_info.points_count}"
-                            )
-                        except Exception as e:
-                            # Handle cases where collection might not exist in Qdrant or other Qdrant client errors for this specific collection
-                            print(
-                                f"Could not get info for Qdrant collection '{qdrant_collection_name}'. It might not exist or Qdrant is unavailable. Error: {e}. Skipping this collection."
-                            )
-                            continue  # Skip to the next collection
-
-                        search_result = await run_in_threadpool(
-                            qdrant_client.search,
-                            collection_name=qdrant_collection_name,
-                            query_vector=query_vector,
-                            limit=5,  # Retrieve top 5 relevant chunks per collection
-                        )
-
-                        for hit in search_result:
-                            if hit.payload and "text" in hit.payload:
-                                all_relevant_chunks.append(hit.payload["text"])
-                        print(
-                            f"Found {len(search_result)} hits in '{qdrant_collection_name}'."
-                        )
-                    except Exception as e:
-                        print(
-                            f"Error searching Qdrant collection '{qdrant_collection_name}': {e}. Skipping this collection."
-                        )
-                        continue  # Skip to the next collection
-
-                if all_relevant_chunks:
-                    retrieved_context_str = (
-                        "\\\\n\\\\n---\\\\nRelevant Information (from active collections):\\\\n"
-                        + "\\\\n\\\\n".join(all_relevant_chunks)
-                        + "\\\\n---\\\\n\\\\n"
-                    )
-                    print(
-                        f"Total relevant chunks retrieved from all active collections: {len(all_relevant_chunks)}"
-                    )
-                    print(f"Aggregated context: {retrieved_context_str}")
-                else:
-                    print("No relevant chunks found in any active Qdrant collections.")
+                print(f"Aggregated context: {retrieved_context_str}")
+            else:
+                print("No relevant chunks found in any active Qdrant collections.")
 
         except openai.APIError as e:
             print(f"OpenAI API error during RAG query embedding: {e}")
         except Exception as e:
             print(f"Error during RAG context retrieval: {e}")
     else:
-        missing_configs = []
-        if not QDRANT_URL:
-            missing_configs.append("QDRANT_URL")
-        if not openai.api_key:
-            missing_configs.append("OPENAI_API_KEY")
-        print(
-            f"Skipping RAG: Missing environment variables: {', '.join(missing_configs)}"
-        )
+        print("Skipping RAG: Missing environment variables: OPENAI_API_KEY")
     # --- End RAG ---
 
-    try:
-        # Prepend retrieved context to the user's message for the prompt
-        prompt_to_gpt = retrieved_context_str + request.message
+    # Prepend retrieved context to the user's message for the prompt
+    prompt_to_gpt = retrieved_context_str + message
 
-        messages_for_gpt = [
-            {
-                "role": "system",
-                "content": "You are an admission chatbot. Use the provided 'Relevant Information' to answer the user's query. If the information is not relevant or not sufficient, answer based on your general knowledge.",
-            },
-            {"role": "user", "content": prompt_to_gpt},
-        ]
+    messages_for_gpt = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt_to_gpt},
+    ]
 
-        print("\\n--- PROMPT FOR GPT ---")
-        print(json.dumps(messages_for_gpt, indent=2))
-        print("--- END PROMPT FOR GPT ---\\n")
+    print("\\n--- PROMPT FOR GPT ---")
+    print(json.dumps(messages_for_gpt, indent=2))
+    print("--- END PROMPT FOR GPT ---\\n")
+    return messages_for_gpt, retrieved_context_str
 
-        response = openai.ChatCompletion.create(  # Corrected to use openai.ChatCompletion.create
-            model="gpt-4.1-mini",  # Or your desired model
-            messages=messages_for_gpt,
-        )
-        bot_message_text = response.choices[0].message.content.strip()
+
+async def answer_cache_key(message: str, context: str) -> Optional[tuple[list[float], str]]:
+    """(query embedding, context fingerprint) for the semantic answer cache, or
+    None when the cache is off. The embedding normally comes from the query
+    embedding cache filled by retrieval."""
+    if not (config.ANSWER_CACHE_ENABLED and openai.api_key):
+        return None
+    try:
+        query_vector = await embed_query(message)
     except Exception as e:
-        print(f"Error calling GPT API: {e}")
-        bot_message_text = "Sorry, I'm having trouble connecting to my brain right now. Please try again later."
+        print(f"Could not embed the message for the answer cache: {e}")
+        return None
+    return query_vector, context_fingerprint(CHAT_MODEL, SYSTEM_PROMPT, context)
 
-    conversation_id_to_return = None
-    created_at_to_return = None
-    conversation = None
 
-    if request.conversation_id:
+async def get_or_create_conversation(
+    db: AsyncSession, conversation_id: Optional[uuid.UUID], current_user: User
+) -> Optional[Conversation]:
+    """Returns the user's conversation, a new one if no id is given, or None if not found."""
+    if conversation_id:
         result = await db.execute(
             select(Conversation).where(
-                Conversation.id == request.conversation_id,
+                Conversation.id == conversation_id,
                 Conversation.user_id == current_user.id,
             )
         )
-        conversation = result.scalars().first()
+        return result.scalars().first()
 
-        if not conversation:
-            return await respond_http(
-                status_code=status.HTTP_404_NOT_FOUND,
-                message_code="CONVERSATION_NOT_FOUND",
-                message="Conversation not found or access denied.",
-            )
+    conversation = Conversation(
+        user_id=current_user.id,
+    )
+    db.add(conversation)
+    await db.flush()
+    return conversation
 
-        conversation_id_to_return = conversation.id
-        created_at_to_return = conversation.created_at
 
-    else:
-        conversation = Conversation(
-            user_id=current_user.id,
+def conversation_not_found_response():
+    return respond_http(
+        status_code=status.HTTP_404_NOT_FOUND,
+        status="error",
+        message="Conversation not found or access denied.",
+    )
+
+
+async def save_bot_message(conversation_id: uuid.UUID, content: str):
+    # The request-scoped session is closed once the response starts streaming
+    async with AsyncSessionLocal() as session:
+        session.add(
+            Message(
+                conversation_id=conversation_id,
+                sender_type="bot",
+                content=content,
+            )
         )
-        db.add(conversation)
-        await db.flush()
-        conversation_id_to_return = conversation.id
-        created_at_to_return = conversation.created_at
+        await session.commit()
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post(
+    "/create",
+    response_model=CreateConversationResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_conversation(
+    request: CreateConversationRequest,
+    db: AsyncSession = Depends(get_db),
+    qdrant_client: AsyncQdrantClient = Depends(get_qdrant),
+    current_user: User = Depends(get_current_user),
+):
+    conversation = await get_or_create_conversation(
+        db, request.conversation_id, current_user
+    )
+    if not conversation:
+        return conversation_not_found_response()
+
+    conversation_id_to_return = conversation.id
+    created_at_to_return = conversation.created_at
+
+    messages_for_gpt, context = await build_prompt_messages(
+        db, qdrant_client, request.message
+    )
+    cache_key = await answer_cache_key(request.message, context)
+    bot_message_text = answer_cache.get(*cache_key) if cache_key else None
+
+    if bot_message_text is None:
+        try:
+            response = await openai.ChatCompletion.acreate(
+                model=CHAT_MODEL,
+                messages=messages_for_gpt,
+            )
+            bot_message_text = response.choices[0].message.content.strip()
+            if cache_key:
+                answer_cache.set(*cache_key, bot_message_text)
+        except Exception as e:
+            print(f"Error calling GPT API: {e}")
+            bot_message_text = FALLBACK_BOT_MESSAGE
 
     user_message_obj = Message(
         conversation_id=conversation_id_to_return,
@@ -238,3 +215,92 @@ async def create_conversation(
         bot_message=bot_message_text,
         created_at=created_at_to_return,
     )
+
+
+@router.post("/create/stream", status_code=status.HTTP_200_OK)
+async def create_conversation_stream(
+    request: CreateConversationRequest,
+    db: AsyncSession = Depends(get_db),
+    qdrant_client: AsyncQdrantClient = Depends(get_qdrant),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Same as `/create`, but streams the answer as Server-Sent Events:
+    `conversation` (ids) first, then one `token` event per generated delta,
+    then `done` with the full message once the bot Message has been saved.
+    """
+    conversation = await get_or_create_conversation(
+        db, request.conversation_id, current_user
+    )
+    if not conversation:
+        return conversation_not_found_response()
+
+    conversation_id = conversation.id
+    created_at = conversation.created_at
+
+    messages_for_gpt, context = await build_prompt_messages(
+        db, qdrant_client, request.message
+    )
+    cache_key = await answer_cache_key(request.message, context)
+    cached_answer = answer_cache.get(*cache_key) if cache_key else None
+
+    db.add(
+        Message(
+            conversation_id=conversation_id,
+            sender_type="user",
+            content=request.message,
+        )
+    )
+    await db.commit()
+
+    async def event_stream():
+        yield sse_event(
+            "conversation",
+            {"conversation_id": str(conversation_id), "created_at": str(created_at)},
+        )
+
+        parts: list[str] = []
+        try:
+            if cached_answer is not None:
+                parts.append(cached_answer)
+                yield sse_event("token", {"content": cached_answer})
+            else:
+                try:
+                    response = await openai.ChatCompletion.acreate(
+                        model=CHAT_MODEL,
+                        messages=messages_for_gpt,
+                        stream=True,
+                    )
+                    async for chunk in response:
+                        delta = chunk["choices"][0]["delta"].get("content")
+                        if delta:
+                            parts.append(delta)
+                            yield sse_event("token", {"content": delta})
+                    if cache_key and parts:
+                        answer_cache.set(*cache_key, "".join(parts).strip())
+                except Exception as e:
+                    print(f"Error calling GPT API: {e}")
+                    if not parts:
+                        parts.append(FALLBACK_BOT_MESSAGE)
+                        yield sse_event("token", {"content": FALLBACK_BOT_MESSAGE})
+        finally:
+            # Also runs when the client disconnects mid-stream, so the turn keeps
+            # the (partial) answer; shielded so that cancellation cannot cut the save short
+            bot_message_text = "".join(parts).strip() or FALLBACK_BOT_MESSAGE
+            await asyncio.shield(save_bot_message(conversation_id, bot_message_text))
+
+        yield sse_event(
+            "done",
+            {
+                "conversation_id": str(conversation_id),
+                "user_message": request.message,
+                "bot_message": bot_message_text,
+                "created_at": str(created_at),
+            },
+        )
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -10,7 +10,7 @@ from bootstrap.db import get_db
 from internal.respond import respond_http
 from internal.password import get_password_hash
 from models.user import User, UserRole
-from api.middleware.jwt_auth import get_current_active_admin
+from api.middleware.jwt_auth import get_current_active_admin, invalidate_cached_user
 
 router = APIRouter()
 
@@ -50,7 +50,7 @@ async def update_user_info(
     update_data = request_data.model_dump(exclude_unset=True)
 
     if "password" in update_data and update_data["password"]:
-        hashed_password = get_password_hash(update_data["password"])
+        hashed_password = await get_password_hash(update_data["password"])
         user_to_update.hashed_password = hashed_password
         del update_data["password"] 
 
@@ -67,6 +67,7 @@ async def update_user_info(
             status="error",
             message=f"An error occurred while updating user: {str(e)}",
         )
+    invalidate_cached_user(user_id)
 
     return respond_http(
         status_code=status.HTTP_200_OK,
@@ -124,6 +125,7 @@ async def delete_user_account(
             status="error",
             message=f"An error occurred while deleting user: {str(e)}",
         )
+    invalidate_cached_user(user_id)
 
     return respond_http(
         status_code=status.HTTP_200_OK,
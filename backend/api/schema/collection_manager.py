@@ -78,6 +78,31 @@ class FileListResponse(BaseModel):
 
 class FileUploadResponse(FileResponse):
     parsed_content_preview: Optional[str] = None
+    job_id: Optional[uuid.UUID] = None
+    job_status: Optional[str] = None
+
+
+# --- Ingestion Job Schemas ---
+class IngestionJobResponse(BaseModel):
+    id: uuid.UUID
+    file_id: uuid.UUID
+    collection_id: uuid.UUID
+    status: str
+    stage: Optional[str] = None
+    progress: float
+    attempts: int
+    error: Optional[str] = None
+    details: Optional[dict] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class IngestionJobListResponse(BaseModel):
+    jobs: List[IngestionJobResponse]
 
 
 # --- Chunk Schemas ---
@@ -87,13 +112,18 @@ class ChunkResponse(BaseModel):
     file_id: uuid.UUID
     file_name: str
     chunk_sequence: int
-    # Add other relevant chunk metadata if available
+    # Character offsets in the joined document and 1-based page; None for
+    # chunks ingested before offsets were recorded
+    start: Optional[int] = None
+    end: Optional[int] = None
+    page: Optional[int] = None
 
     class Config:
         from_attributes = True
 
 class ChunkListResponse(BaseModel):
     chunks: List[ChunkResponse]
+    next_cursor: Optional[str] = None  # Pass as `cursor` to get the next page; None on the last page
 
 
 __all__ = [
@@ -109,6 +139,8 @@ __all__ = [
     "FileResponse",
     "FileListResponse",
     "FileUploadResponse",
+    "IngestionJobResponse",
+    "IngestionJobListResponse",
     "ChunkResponse", # Added
     "ChunkListResponse", # Added
 ]
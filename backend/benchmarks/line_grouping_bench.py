@@ -0,0 +1,101 @@
+"""Compares the sort-and-sweep row grouper with the old MeanShift clustering.
+
+Usage:
+    python -m benchmarks.line_grouping_bench [DETECTIONS ...] [--repeat 5]
+
+Each DETECTIONS file is a recorded text-line detection response (the JSON
+returned by TEXTLINE_URL, or just its `predicts[0]` box list). Without files,
+synthetic pages are generated. MeanShift timings and the agreement check are
+only reported when scikit-learn is installed.
+"""
+
+import argparse
+import json
+import random
+import time
+from pathlib import Path
+
+import numpy as np
+
+from internal.readers.line_grouping import group_rows
+
+try:
+    from sklearn.cluster import MeanShift
+except ImportError:
+    MeanShift = None
+
+
+def load_page(path: Path) -> list[list[float]]:
+    data = json.loads(path.read_text())
+    boxes = data["predicts"][0] if isinstance(data, dict) else data
+    lines = []
+    for box in boxes:
+        x1, y1, x2, y2 = box["2point"][:4]
+        lines.append([x1, y1, x2, y2, (x1 + x2) / 2, (y1 + y2) / 2])
+    return lines
+
+
+def synthetic_page(rows: int = 60, boxes_per_row: int = 6, seed: int = 0) -> list[list[float]]:
+    rng = random.Random(seed)
+    lines = []
+    for row in range(rows):
+        top = 80 + row * 28
+        for col in range(boxes_per_row):
+            x1 = 60 + col * 190 + rng.randint(0, 10)
+            y1 = top + rng.randint(-1, 1)
+            x2, y2 = x1 + rng.randint(80, 170), y1 + 22
+            lines.append([x1, y1, x2, y2, (x1 + x2) / 2, (y1 + y2) / 2])
+    rng.shuffle(lines)
+    return lines
+
+
+def meanshift_rows(lines: list[list[float]]) -> list[list]:
+    """The previous nonpdf.line_clustering + row ordering."""
+    labels = MeanShift(bandwidth=2).fit(np.array([[line[5]] for line in lines])).labels_
+    clusters: dict[int, list] = {}
+    for line, label in zip(lines, labels):
+        clusters.setdefault(label, []).append(line)
+    rows = sorted(clusters.values(), key=lambda row: row[0][5])
+    return [sorted(row, key=lambda line: line[4]) for row in rows]
+
+
+def timed(fn, pages, repeat: int) -> tuple[float, list]:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = [fn(page) for page in pages]
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("detections", nargs="*", type=Path)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.detections:
+        pages = [load_page(path) for path in args.detections]
+    else:
+        pages = [synthetic_page(seed=seed) for seed in range(20)]
+    pages = [page for page in pages if page]
+    total_boxes = sum(len(page) for page in pages)
+    print(f"{len(pages)} pages, {total_boxes} boxes")
+
+    sweep_time, sweep_rows = timed(group_rows, pages, args.repeat)
+    print(f"sort-and-sweep: {sweep_time * 1000:.2f} ms")
+
+    if MeanShift is None:
+        print("scikit-learn not installed, skipping the MeanShift comparison.")
+        return
+
+    meanshift_time, meanshift_result = timed(meanshift_rows, pages, args.repeat)
+    print(f"MeanShift:      {meanshift_time * 1000:.2f} ms")
+    print(f"speedup:        {meanshift_time / sweep_time:.1f}x")
+
+    same = sum(a == b for a, b in zip(sweep_rows, meanshift_result))
+    print(f"identical reading order on {same}/{len(pages)} pages")
+
+
+if __name__ == "__main__":
+    main()
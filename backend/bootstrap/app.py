@@ -11,11 +11,16 @@ from api.router import (
     admin_router,
     collection_manager_router,
 )
+from bootstrap.config import config
 from bootstrap.db import init_db
-from fastapi import FastAPI
+from bootstrap.qdrant import check_qdrant_health, close_qdrant, get_qdrant, init_qdrant
+from fastapi import FastAPI, status
 from fastapi.exceptions import HTTPException as FastAPIHTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from internal.ingestion import ingestion_pool
+from internal.qdrant_registry import qdrant_registry
 from internal.respond import respond_http
+from internal.uploads import UploadSizeLimitMiddleware
 from starlette.requests import Request
 
 
@@ -31,6 +36,8 @@ def create_app() -> FastAPI:
         allow_headers=["*"],  # Allow all headers
     )
 
+    app.add_middleware(UploadSizeLimitMiddleware)
+
     # Include routers
     app.include_router(login_router, prefix="/api/auth", tags=["auth"])
     app.include_router(register_router, prefix="/api/auth", tags=["auth"])
@@ -60,7 +67,30 @@ def create_app() -> FastAPI:
 
     @app.on_event("startup")
     async def on_startup():
-        await init_db()
+        if config.DB_CREATE_TABLES_ON_STARTUP:
+            await init_db()
+        qdrant_client = await init_qdrant()
+        try:
+            await qdrant_registry.load(qdrant_client)
+        except Exception as e:
+            # Lookups fall back to Qdrant until the registry fills up
+            print(f"Could not load the Qdrant collection registry: {e}")
+        await ingestion_pool.start()
+
+    @app.on_event("shutdown")
+    async def on_shutdown():
+        await ingestion_pool.stop()
+        await close_qdrant()
+
+    @app.get("/api/health", tags=["health"])
+    async def health():
+        qdrant_ok = await check_qdrant_health(get_qdrant())
+        return respond_http(
+            status_code=status.HTTP_200_OK if qdrant_ok else status.HTTP_503_SERVICE_UNAVAILABLE,
+            status="success" if qdrant_ok else "error",
+            message="OK" if qdrant_ok else "Qdrant is unreachable.",
+            data={"qdrant": qdrant_ok},
+        )
 
     @app.exception_handler(FastAPIHTTPException)
     async def custom_http_exception_handler(
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Literal, Optional
 
 
 class Config(BaseSettings):
@@ -8,6 +8,13 @@ class Config(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # Authenticated users are cached per process; changes made through another
+    # process (disabling, role change) take effect within the TTL
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_MAX_ENTRIES: int = 10_000
+    # bcrypt runs on a dedicated thread pool of this size, off the event loop
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_BCRYPT_ROUNDS: int = 12  # Existing hashes are upgraded on login when this changes
 
     # Database settings
     POSTGRES_SERVER: str
@@ -16,11 +23,102 @@ class Config(BaseSettings):
     POSTGRES_DB: str
     POSTGRES_PORT: int = 5432
     DATABASE_URL: Optional[str] = None  # Will be constructed if not provided
+    # Engine and connection pool, per process: size the pool for workers x replicas
+    DB_ECHO: bool = False  # Log every SQL statement
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10  # Extra connections opened under load, closed when returned
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0  # Wait for a free connection before failing
+    DB_POOL_RECYCLE_SECONDS: int = 1800  # Reconnect connections older than this
+    DB_POOL_PRE_PING: bool = True  # Check connections on checkout (survives DB restarts)
+    # asyncpg prepared statements cached per connection; 0 disables (e.g. behind PgBouncer)
+    DB_STATEMENT_CACHE_SIZE: int = 500
 
     # Qdrant settings
     QDRANT_HOST: str = "localhost"
     QDRANT_PORT: int = 6333
     QDRANT_API_KEY: Optional[str] = None # Add API key if Qdrant Cloud or secured instance
+    QDRANT_URL: Optional[str] = None  # Overrides QDRANT_HOST/QDRANT_PORT when set
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_TIMEOUT_SECONDS: int = 10
+    QDRANT_MAX_CONNECTIONS: int = 100  # Shared client pool size (per process)
+    QDRANT_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    QDRANT_REGISTRY_TTL_SECONDS: int = 300  # Known-collection entries are re-checked after this
+    QDRANT_REGISTRY_MISSING_TTL_SECONDS: float = 2.0  # Same for collections found missing
+    # "per_collection": one Qdrant collection per Collection row (collection_<uuid>)
+    # "shared": every chunk in QDRANT_SHARED_COLLECTION, filtered by collection_id payload
+    QDRANT_STORAGE_MODE: Literal["per_collection", "shared"] = "per_collection"
+    QDRANT_SHARED_COLLECTION: str = "documents"
+
+    # Uploads
+    MAX_UPLOAD_BYTES: int = 100 * 1024 * 1024  # Larger uploads are rejected with 413
+
+    # Uploaded file bytes, stored by SHA-256 outside Postgres
+    BLOB_STORE_BACKEND: Literal["local"] = "local"
+    BLOB_STORE_PATH: str = "data/blobs"
+
+    # Ingestion (background parse -> chunk -> embed -> upsert jobs)
+    INGESTION_WORKERS: int = 2  # Max jobs running at once per process
+    INGESTION_MAX_PENDING_JOBS: int = 100  # Uploads are rejected with 503 above this
+    INGESTION_POLL_INTERVAL_SECONDS: float = 5.0
+    INGESTION_JOB_LEASE_SECONDS: int = 900  # RUNNING jobs without heartbeat are reclaimed
+    INGESTION_MAX_ATTEMPTS: int = 3
+    # Jobs failing on a transient error (timeouts, 429/5xx) are requeued after
+    # this delay, doubled on every attempt
+    INGESTION_RETRY_BACKOFF_SECONDS: float = 30.0
+    INGESTION_RETRY_BACKOFF_MAX_SECONDS: float = 600.0
+
+    # Chunking (see internal/chunking.py)
+    CHUNK_STRATEGY: Literal["fixed", "sentence", "token"] = "sentence"
+    CHUNK_SIZE: int = 1000  # Characters, for the fixed and sentence strategies
+    CHUNK_OVERLAP: int = 100
+    CHUNK_MAX_TOKENS: int = 300  # For the token strategy
+    CHUNK_OVERLAP_TOKENS: int = 30
+
+    # Embeddings
+    EMBEDDING_MODEL: str = "text-embedding-ada-002"
+    EMBEDDING_BATCH_SIZE: int = 96  # Chunks per Embedding.acreate call
+    EMBEDDING_MAX_CONCURRENCY: int = 4  # Batches in flight per process
+    # Provider quota for the whole deployment, split evenly across EMBEDDING_QUOTA_PROCESSES
+    EMBEDDING_REQUESTS_PER_MINUTE: int = 3000
+    EMBEDDING_TOKENS_PER_MINUTE: int = 1_000_000
+    # Processes sharing the quota; main.py sets it to the worker count in production mode
+    EMBEDDING_QUOTA_PROCESSES: int = 1
+    EMBEDDING_MAX_RETRIES: int = 6
+    EMBEDDING_CACHE_ENABLED: bool = True  # Persistent (model, chunk hash) cache
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 500_000
+
+    # Retrieval (RAG)
+    RAG_TOP_K: int = 8  # Chunks kept across all active collections
+    RAG_COLLECTION_TIMEOUT_SECONDS: float = 3.0  # Per-collection search budget
+    # In-process caches of query embeddings and retrieved chunks (0 entries disables)
+    QUERY_EMBEDDING_CACHE_MAX_ENTRIES: int = 10_000
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: int = 86_400
+    RETRIEVAL_CACHE_MAX_ENTRIES: int = 5_000
+    RETRIEVAL_CACHE_TTL_SECONDS: int = 600
+    # Semantic answer cache: reuse the answer to a paraphrased question asked
+    # against the same retrieved context (opt-in)
+    ANSWER_CACHE_ENABLED: bool = False
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95  # Cosine similarity of the queries
+    ANSWER_CACHE_MAX_ENTRIES: int = 2_000
+    ANSWER_CACHE_TTL_SECONDS: int = 3_600
+
+    # Server (main.py)
+    # "development": one auto-reloading process; "production": SERVER_WORKERS processes
+    SERVER_MODE: Literal["development", "production"] = "development"
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    # Defaults to the usable CPU cores. Every worker has its own DB pool, Qdrant
+    # client and INGESTION_WORKERS, so the default is lowered when
+    # workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) would exceed SERVER_DB_CONNECTIONS
+    SERVER_WORKERS: Optional[int] = None
+    # Postgres connections this replica may use; defaults to the server's
+    # max_connections (minus superuser slots). Set it lower when running replicas
+    SERVER_DB_CONNECTIONS: Optional[int] = None
+    SERVER_KEEPALIVE_SECONDS: int = 5
+    SERVER_GRACEFUL_SHUTDOWN_SECONDS: int = 30  # In-flight requests / streams get this long
+    # Run create_all on app startup; main.py does it once itself in production mode
+    DB_CREATE_TABLES_ON_STARTUP: bool = True
 
     # CORS settings
     BACKEND_CORS_ORIGINS: list[str] = [
@@ -33,6 +131,13 @@ class Config(BaseSettings):
         env_file=".env", env_file_encoding="utf-8", extra="ignore"
     )
 
+    @property
+    def qdrant_url(self) -> str:
+        if self.QDRANT_URL:
+            return self.QDRANT_URL
+
+        return f"http://{self.QDRANT_HOST}:{self.QDRANT_PORT}"
+
     @property
     def sqlalchemy_database_url(self) -> str:
         if self.DATABASE_URL:
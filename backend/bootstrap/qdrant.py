@@ -0,0 +1,63 @@
+from typing import Optional
+
+import httpx
+from fastapi import HTTPException, status
+from qdrant_client import AsyncQdrantClient
+
+from bootstrap.config import config
+
+_qdrant_client: Optional[AsyncQdrantClient] = None
+
+
+def create_qdrant_client() -> AsyncQdrantClient:
+    return AsyncQdrantClient(
+        url=config.qdrant_url,
+        api_key=config.QDRANT_API_KEY,
+        prefer_grpc=config.QDRANT_PREFER_GRPC,
+        grpc_port=config.QDRANT_GRPC_PORT,
+        timeout=config.QDRANT_TIMEOUT_SECONDS,
+        # Forwarded to the underlying httpx client: keep-alive connection pool
+        limits=httpx.Limits(
+            max_connections=config.QDRANT_MAX_CONNECTIONS,
+            max_keepalive_connections=config.QDRANT_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+    )
+
+
+async def check_qdrant_health(client: AsyncQdrantClient) -> bool:
+    try:
+        await client.get_collections()
+        return True
+    except Exception as e:
+        print(f"Qdrant health check failed: {e}")
+        return False
+
+
+async def init_qdrant() -> AsyncQdrantClient:
+    """Creates the process-wide Qdrant client. Called once at app startup."""
+    global _qdrant_client
+    if _qdrant_client is None:
+        _qdrant_client = create_qdrant_client()
+        if await check_qdrant_health(_qdrant_client):
+            print(f"Connected to Qdrant at {config.qdrant_url}.")
+        else:
+            # Not fatal: requests retry through the same client once Qdrant is up
+            print(f"Qdrant at {config.qdrant_url} is not reachable yet.")
+    return _qdrant_client
+
+
+async def close_qdrant():
+    global _qdrant_client
+    if _qdrant_client is not None:
+        await _qdrant_client.close()
+        _qdrant_client = None
+
+
+def get_qdrant() -> AsyncQdrantClient:
+    """FastAPI dependency returning the shared Qdrant client."""
+    if _qdrant_client is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Qdrant client is not initialized.",
+        )
+    return _qdrant_client
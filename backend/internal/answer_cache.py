@@ -0,0 +1,132 @@
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from bootstrap.config import config
+
+
+@dataclass
+class CachedAnswer:
+    context_fingerprint: str
+    answer: str
+    expires_at: float
+    last_used_at: float
+
+
+def context_fingerprint(model: str, system_prompt: str, context: str) -> str:
+    """Identifies everything besides the user message that shapes an answer:
+    the chat model, the system prompt and the retrieved context."""
+    digest = hashlib.sha256()
+    for part in (model, system_prompt, context):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class SemanticAnswerCache:
+    """Small in-process vector index of (query embedding, context fingerprint, answer).
+
+    A lookup returns the answer of the most similar cached query if the cosine
+    similarity reaches `threshold` and it was answered from the same context
+    fingerprint. The retrieved chunk texts are part of the fingerprint, so an
+    answer is only reused while retrieval still returns exactly what it was
+    generated from.
+    Entries expire after `ttl_seconds`; past `max_entries` the least recently
+    used one is replaced.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, threshold: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._vectors: Optional[np.ndarray] = None  # (max_entries, dim), unit rows
+        self._entries: list[CachedAnswer] = []
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _unit(vector: list[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def get(self, query_vector: list[float], fingerprint: str) -> Optional[str]:
+        if not self._entries:
+            self.misses += 1
+            return None
+
+        now = time.monotonic()
+        similarities = self._vectors[: len(self._entries)] @ self._unit(query_vector)
+        # Best candidate first; stop once below the threshold
+        for index in np.argsort(similarities)[::-1]:
+            if similarities[index] < self.threshold:
+                break
+            entry = self._entries[index]
+            if entry.expires_at <= now or entry.context_fingerprint != fingerprint:
+                continue
+            entry.last_used_at = now
+            self.hits += 1
+            return entry.answer
+
+        self.misses += 1
+        return None
+
+    def set(self, query_vector: list[float], fingerprint: str, answer: str):
+        if self.max_entries <= 0:
+            return
+
+        now = time.monotonic()
+        vector = self._unit(query_vector)
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+
+        entry = CachedAnswer(
+            context_fingerprint=fingerprint,
+            answer=answer,
+            expires_at=now + self.ttl_seconds,
+            last_used_at=now,
+        )
+        if len(self._entries) < self.max_entries:
+            index = len(self._entries)
+            self._entries.append(entry)
+        else:
+            # Reuse an expired slot, else the least recently used one
+            index = min(
+                range(len(self._entries)),
+                key=lambda i: (
+                    -1.0
+                    if self._entries[i].expires_at <= now
+                    else self._entries[i].last_used_at
+                ),
+            )
+            self.evictions += 1
+            self._entries[index] = entry
+        self._vectors[index] = vector
+
+    def clear(self):
+        self._entries = []
+        self._vectors = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": config.ANSWER_CACHE_ENABLED,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+        }
+
+
+answer_cache = SemanticAnswerCache(
+    max_entries=config.ANSWER_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.ANSWER_CACHE_TTL_SECONDS,
+    threshold=config.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+)
@@ -0,0 +1,269 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from bootstrap.config import config
+from models.file import File as FileModel
+
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+class BlobNotFoundError(Exception):
+    """Raised when no blob is stored under a hash."""
+
+
+class BlobTooLargeError(Exception):
+    """Raised when content being staged exceeds its size limit."""
+
+
+@dataclass
+class StagedBlob:
+    """Content written to the store under a temporary name, hashed and measured
+    on the way. Becomes addressable by `sha256` once committed."""
+
+    sha256: str
+    size: int
+    head: bytes  # First `head_bytes` of the content
+    location: str  # Backend-specific temporary name
+
+
+class BlobStore(ABC):
+    """Content-addressed storage for uploaded file bytes, keyed by SHA-256.
+
+    Storing the same content twice keeps a single copy.
+    """
+
+    @abstractmethod
+    async def put(self, sha256: str, fileobj: BinaryIO) -> bool:
+        """Stores the content of `fileobj`. Returns False if it was already stored."""
+
+    @abstractmethod
+    async def put_bytes(self, sha256: str, data: bytes) -> bool:
+        ...
+
+    @abstractmethod
+    async def stage(
+        self, fileobj: BinaryIO, max_bytes: Optional[int] = None, head_bytes: int = 0
+    ) -> StagedBlob:
+        """Copies `fileobj` into the store in one pass, computing its hash and size.
+        Raises BlobTooLargeError past `max_bytes`."""
+
+    @abstractmethod
+    async def commit(self, staged: StagedBlob) -> bool:
+        """Stores staged content under its hash. Returns False if it was already stored."""
+
+    @abstractmethod
+    async def discard(self, staged: StagedBlob):
+        """Drops staged content; does nothing once it was committed."""
+
+    @abstractmethod
+    async def exists(self, sha256: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def size(self, sha256: str) -> int:
+        ...
+
+    @abstractmethod
+    async def read(self, sha256: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        """Returns bytes [start, end) of the blob (to the end if `end` is None)."""
+
+    async def iter_range(
+        self, sha256: str, start: int = 0, end: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """Yields bytes [start, end) of the blob in READ_CHUNK_BYTES pieces."""
+        end = await self.size(sha256) if end is None else end
+        position = start
+        while position < end:
+            chunk_end = min(position + READ_CHUNK_BYTES, end)
+            yield await self.read(sha256, position, chunk_end)
+            position = chunk_end
+
+    @abstractmethod
+    async def delete(self, sha256: str):
+        ...
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files under `root`, sharded as `ab/cd/abcd...`."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, sha256: str) -> Path:
+        if len(sha256) != 64 or not all(c in "0123456789abcdef" for c in sha256):
+            raise ValueError(f"Invalid blob hash: {sha256!r}")
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def _write(self, sha256: str, fileobj: BinaryIO) -> bool:
+        path = self._path(sha256)
+        if path.exists():
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write next to the target and rename, so readers never see a partial blob
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                shutil.copyfileobj(fileobj, tmp_file, READ_CHUNK_BYTES)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return True
+
+    def _stage(
+        self, fileobj: BinaryIO, max_bytes: Optional[int], head_bytes: int
+    ) -> StagedBlob:
+        staging_dir = self.root / ".staging"
+        staging_dir.mkdir(parents=True, exist_ok=True)
+        # Same filesystem as the blobs, so commit is a rename
+        fd, tmp_path = tempfile.mkstemp(dir=staging_dir, prefix=".tmp-")
+        digest = hashlib.sha256()
+        size = 0
+        head = b""
+        try:
+            with os.fdopen(fd, "wb") as tmp_file:
+                while chunk := fileobj.read(READ_CHUNK_BYTES):
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise BlobTooLargeError(f"Content exceeds {max_bytes} bytes.")
+                    if len(head) < head_bytes:
+                        head += chunk[: head_bytes - len(head)]
+                    digest.update(chunk)
+                    tmp_file.write(chunk)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return StagedBlob(sha256=digest.hexdigest(), size=size, head=head, location=tmp_path)
+
+    async def stage(
+        self, fileobj: BinaryIO, max_bytes: Optional[int] = None, head_bytes: int = 0
+    ) -> StagedBlob:
+        return await run_in_threadpool(self._stage, fileobj, max_bytes, head_bytes)
+
+    def _commit(self, staged: StagedBlob) -> bool:
+        path = self._path(staged.sha256)
+        if path.exists():
+            self._discard(staged)
+            return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(staged.location, path)
+        return True
+
+    async def commit(self, staged: StagedBlob) -> bool:
+        return await run_in_threadpool(self._commit, staged)
+
+    def _discard(self, staged: StagedBlob):
+        try:
+            os.unlink(staged.location)
+        except FileNotFoundError:
+            pass
+
+    async def discard(self, staged: StagedBlob):
+        await run_in_threadpool(self._discard, staged)
+
+    async def put(self, sha256: str, fileobj: BinaryIO) -> bool:
+        return await run_in_threadpool(self._write, sha256, fileobj)
+
+    async def put_bytes(self, sha256: str, data: bytes) -> bool:
+        return await run_in_threadpool(self._write, sha256, io.BytesIO(data))
+
+    async def exists(self, sha256: str) -> bool:
+        return await run_in_threadpool(self._path(sha256).exists)
+
+    async def size(self, sha256: str) -> int:
+        try:
+            return (await run_in_threadpool(self._path(sha256).stat)).st_size
+        except FileNotFoundError as e:
+            raise BlobNotFoundError(sha256) from e
+
+    def _read(self, sha256: str, start: int, end: Optional[int]) -> bytes:
+        try:
+            with open(self._path(sha256), "rb") as f:
+                f.seek(start)
+                return f.read() if end is None else f.read(max(0, end - start))
+        except FileNotFoundError as e:
+            raise BlobNotFoundError(sha256) from e
+
+    async def read(self, sha256: str, start: int = 0, end: Optional[int] = None) -> bytes:
+        return await run_in_threadpool(self._read, sha256, start, end)
+
+    async def delete(self, sha256: str):
+        try:
+            await run_in_threadpool(self._path(sha256).unlink)
+        except FileNotFoundError:
+            pass
+
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """Parses a single-range `Range: bytes=...` header into [start, end).
+
+    Returns None when there is no (usable) header, so the whole blob is sent.
+    Raises ValueError when the range lies outside the blob (416).
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) + 1 if last else size
+        else:
+            # Suffix range: the last N bytes
+            start, end = max(0, size - int(last)), size
+    except ValueError:
+        return None
+    if start >= size or start >= end:
+        raise ValueError(f"Range {header!r} not satisfiable for {size} bytes.")
+    return start, min(end, size)
+
+
+def create_blob_store() -> BlobStore:
+    if config.BLOB_STORE_BACKEND == "local":
+        return LocalBlobStore(config.BLOB_STORE_PATH)
+    raise ValueError(f"Unknown BLOB_STORE_BACKEND: {config.BLOB_STORE_BACKEND}")
+
+
+async def lock_blob(db: AsyncSession, sha256: str):
+    """Takes a transaction-scoped Postgres advisory lock on a blob hash.
+
+    Held by uploads from storing the blob until their File row is committed,
+    and by garbage collection from counting references until the unlink, so a
+    blob cannot be deleted while a new row starts pointing to it.
+    """
+    # Advisory lock keys are signed 64-bit; 60 bits of the hash are plenty
+    await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": int(sha256[:15], 16)})
+
+
+async def delete_unreferenced_blobs(db: AsyncSession, hashes: set[str]):
+    """Deletes the blobs no File row points to anymore. Call after the commit
+    that removed the rows; commits `db` once per hash to release its lock."""
+    for sha256 in hashes:
+        if not sha256:
+            continue
+        await lock_blob(db, sha256)
+        references = (
+            await db.execute(
+                select(func.count())
+                .select_from(FileModel)
+                .where(FileModel.content_hash == sha256)
+            )
+        ).scalar_one()
+        if references == 0:
+            await blob_store.delete(sha256)
+        await db.commit()
+
+
+blob_store = create_blob_store()
@@ -0,0 +1,165 @@
+import re
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Callable, Iterator, Optional
+
+from bootstrap.config import config
+from internal.embedding import estimate_tokens
+
+_encoding = None
+_encoding_unavailable = False
+
+
+def count_tokens(text: str) -> int:
+    """Tokens of `text` under the cl100k_base tokenizer of text-embedding-ada-002.
+
+    The encoding is loaded on first use (tiktoken may download it); without
+    tiktoken or the encoding, `estimate_tokens` is used instead.
+    """
+    global _encoding, _encoding_unavailable
+    if _encoding is None and not _encoding_unavailable:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"tiktoken encoding unavailable, estimating token counts: {e}")
+            _encoding_unavailable = True
+    if _encoding is None:
+        return estimate_tokens(text)
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+PAGE_SEPARATOR = "\n\n"
+
+# A segment ends after sentence punctuation followed by whitespace, or at a line break
+_SEGMENT_END = re.compile(r"(?<=[.!?…;:])\s+|\n\s*")
+_WORD = re.compile(r"\S+\s*")
+
+
+@dataclass
+class Chunk:
+    text: str
+    start: int  # Character offsets of the chunk in the joined document
+    end: int
+    page: Optional[int] = None  # 1-based page the chunk starts on
+
+
+@dataclass
+class _Piece:
+    start: int
+    end: int
+    size: int  # In the strategy's unit (characters or tokens)
+
+
+def _segments(text: str) -> Iterator[tuple[int, int]]:
+    """Sentence / line spans covering `text` end to end, in one regex pass."""
+    start = 0
+    for match in _SEGMENT_END.finditer(text):
+        if match.end() > start:
+            yield start, match.end()
+            start = match.end()
+    if start < len(text):
+        yield start, len(text)
+
+
+def _pieces(text: str, budget: int, measure: Callable[[str], int]) -> Iterator[_Piece]:
+    """Segments, with segments over `budget` broken at word boundaries."""
+    for start, end in _segments(text):
+        size = measure(text[start:end])
+        if size <= budget:
+            yield _Piece(start, end, size)
+            continue
+        for word in _WORD.finditer(text, start, end):
+            yield _Piece(word.start(), word.end(), measure(word.group()))
+
+
+def _pack(text: str, pieces: Iterator[_Piece], budget: int, overlap: int) -> list[Chunk]:
+    """Greedily fills chunks up to `budget`, repeating up to `overlap` worth of
+    trailing pieces at the start of the next chunk."""
+    chunks: list[Chunk] = []
+    current: list[_Piece] = []
+    size = 0
+
+    def emit():
+        raw = text[current[0].start : current[-1].end]
+        stripped = raw.strip()
+        if stripped:
+            start = current[0].start + (len(raw) - len(raw.lstrip()))
+            chunks.append(Chunk(text=stripped, start=start, end=start + len(stripped)))
+
+    for piece in pieces:
+        if current and size + piece.size > budget:
+            emit()
+            carried: list[_Piece] = []
+            carried_size = 0
+            for previous in reversed(current):
+                if carried_size + previous.size > overlap:
+                    break
+                carried.append(previous)
+                carried_size += previous.size
+            carried.reverse()
+            if carried_size + piece.size > budget:
+                carried, carried_size = [], 0
+            current, size = carried, carried_size
+        current.append(piece)
+        size += piece.size
+
+    if current:
+        emit()
+    return chunks
+
+
+def chunk_fixed(text: str) -> list[Chunk]:
+    """Fixed CHUNK_SIZE character windows with CHUNK_OVERLAP characters of overlap."""
+    chunks = []
+    step = max(1, config.CHUNK_SIZE - config.CHUNK_OVERLAP)
+    for start in range(0, len(text), step):
+        end = min(start + config.CHUNK_SIZE, len(text))
+        chunks.append(Chunk(text=text[start:end], start=start, end=end))
+        if end >= len(text):
+            break
+    return chunks
+
+
+def chunk_sentences(text: str) -> list[Chunk]:
+    """Whole sentences / lines packed up to CHUNK_SIZE characters."""
+    return _pack(
+        text,
+        _pieces(text, config.CHUNK_SIZE, len),
+        config.CHUNK_SIZE,
+        config.CHUNK_OVERLAP,
+    )
+
+
+def chunk_tokens(text: str) -> list[Chunk]:
+    """Whole sentences / lines packed up to CHUNK_MAX_TOKENS embedding tokens."""
+    return _pack(
+        text,
+        _pieces(text, config.CHUNK_MAX_TOKENS, count_tokens),
+        config.CHUNK_MAX_TOKENS,
+        config.CHUNK_OVERLAP_TOKENS,
+    )
+
+
+CHUNKERS: dict[str, Callable[[str], list[Chunk]]] = {
+    "fixed": chunk_fixed,
+    "sentence": chunk_sentences,
+    "token": chunk_tokens,
+}
+
+
+def chunk_pages(pages: list[str], strategy: Optional[str] = None) -> list[Chunk]:
+    """Joins the pages of a document and chunks it with `strategy`
+    (CHUNK_STRATEGY by default). Each chunk records the page it starts on."""
+    chunker = CHUNKERS[strategy or config.CHUNK_STRATEGY]
+    page_starts = []
+    offset = 0
+    for page in pages:
+        page_starts.append(offset)
+        offset += len(page) + len(PAGE_SEPARATOR)
+
+    chunks = chunker(PAGE_SEPARATOR.join(pages))
+    for chunk in chunks:
+        chunk.page = bisect_right(page_starts, chunk.start)
+    return chunks
@@ -0,0 +1,204 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Optional
+
+import openai
+from openai import error as openai_error
+
+from bootstrap.config import config
+from internal.embedding_cache import EmbeddingCache, chunk_hash, embedding_cache
+
+# Errors worth retrying; everything else (bad request, auth, ...) fails fast
+RETRYABLE_ERRORS = (
+    openai_error.RateLimitError,
+    openai_error.APIError,
+    openai_error.Timeout,
+    openai_error.APIConnectionError,
+    openai_error.ServiceUnavailableError,
+    openai_error.TryAgain,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap upper-ish estimate of the token count (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_second
+        )
+        self._updated_at = now
+
+    async def acquire(self, amount: float = 1.0):
+        # A single request larger than the bucket could never be served otherwise
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                await asyncio.sleep((amount - self._tokens) / self.rate_per_second)
+                self._refill()
+            self._tokens -= amount
+
+
+class BatchEmbedder:
+    """Embeds many texts with few `Embedding.acreate` calls.
+
+    Texts are split into batches of `batch_size`, at most `max_concurrency`
+    batches are in flight, and every call is throttled by request and token
+    buckets sized to the provider quota. Retryable errors back off
+    exponentially (with jitter, honouring `Retry-After` when present).
+    When a cache is given, texts already embedded with the same model are
+    served from it and only the misses are sent to the API.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        batch_size: int,
+        max_concurrency: int,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_retries: int,
+        backoff_base_seconds: float = 1.0,
+        backoff_max_seconds: float = 60.0,
+        cache: Optional[EmbeddingCache] = None,
+    ):
+        self.model = model
+        self.cache = cache
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._request_bucket = TokenBucket(requests_per_minute)
+        self._token_bucket = TokenBucket(tokens_per_minute)
+
+    async def embed(
+        self,
+        texts: list[str],
+        on_progress: Optional[Callable[[int], Awaitable[None]]] = None,
+    ) -> list[list[float]]:
+        """Returns one embedding per text, in input order.
+
+        `on_progress` is awaited with the number of texts embedded so far
+        each time a batch completes.
+        """
+        if not texts:
+            return []
+        if self.cache is None:
+            return await self._embed_uncached(texts, on_progress)
+
+        hashes = [chunk_hash(text) for text in texts]
+        try:
+            vectors = await self.cache.get_many(self.model, hashes)
+        except Exception as e:
+            print(f"Embedding cache lookup failed, embedding everything: {e}")
+            vectors = {}
+
+        missing: dict[str, str] = {}
+        for text_hash, text in zip(hashes, texts):
+            if text_hash not in vectors:
+                missing.setdefault(text_hash, text)
+        cached_count = len(texts) - sum(1 for h in hashes if h in missing)
+        print(f"Embedding cache: {cached_count}/{len(texts)} chunks already embedded.")
+
+        async def report_progress(done: int):
+            if on_progress is not None:
+                await on_progress(cached_count + done)
+
+        if cached_count:
+            await report_progress(0)
+        fresh = await self._embed_uncached(list(missing.values()), report_progress)
+        new_vectors = dict(zip(missing.keys(), fresh))
+        try:
+            await self.cache.put_many(self.model, new_vectors)
+        except Exception as e:
+            print(f"Failed to store embeddings in cache: {e}")
+
+        vectors.update(new_vectors)
+        return [vectors[text_hash] for text_hash in hashes]
+
+    async def _embed_uncached(
+        self,
+        texts: list[str],
+        on_progress: Optional[Callable[[int], Awaitable[None]]] = None,
+    ) -> list[list[float]]:
+        if not texts:
+            return []
+
+        batches = [
+            texts[i : i + self.batch_size] for i in range(0, len(texts), self.batch_size)
+        ]
+        done = 0
+
+        async def run_batch(batch: list[str]) -> list[list[float]]:
+            nonlocal done
+            async with self._semaphore:
+                vectors = await self._embed_batch(batch)
+            done += len(batch)
+            if on_progress is not None:
+                await on_progress(done)
+            return vectors
+
+        results = await asyncio.gather(*(run_batch(b) for b in batches))
+        return [vector for batch_vectors in results for vector in batch_vectors]
+
+    async def _embed_batch(self, batch: list[str]) -> list[list[float]]:
+        tokens = sum(estimate_tokens(text) for text in batch)
+        attempt = 0
+        while True:
+            await self._request_bucket.acquire()
+            await self._token_bucket.acquire(tokens)
+            try:
+                response = await openai.Embedding.acreate(input=batch, model=self.model)
+                data = sorted(response["data"], key=lambda item: item["index"])
+                return [item["embedding"] for item in data]
+            except RETRYABLE_ERRORS as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    print(f"Giving up on embedding batch after {attempt} attempts: {e}")
+                    raise
+                delay = self._retry_delay(e, attempt)
+                print(
+                    f"Embedding batch failed ({type(e).__name__}: {e}). Retry {attempt}/{self.max_retries} in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        retry_after = None
+        headers = getattr(error, "headers", None) or {}
+        try:
+            retry_after = float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            pass
+        backoff = min(
+            self.backoff_max_seconds, self.backoff_base_seconds * 2 ** (attempt - 1)
+        )
+        # Full jitter keeps concurrent batches from retrying in lockstep
+        delay = random.uniform(0, backoff)
+        return max(delay, retry_after or 0.0)
+
+
+embedder = BatchEmbedder(
+    model=config.EMBEDDING_MODEL,
+    batch_size=config.EMBEDDING_BATCH_SIZE,
+    max_concurrency=config.EMBEDDING_MAX_CONCURRENCY,
+    # Each process gets its share of the quota
+    requests_per_minute=config.EMBEDDING_REQUESTS_PER_MINUTE // max(1, config.EMBEDDING_QUOTA_PROCESSES),
+    tokens_per_minute=config.EMBEDDING_TOKENS_PER_MINUTE // max(1, config.EMBEDDING_QUOTA_PROCESSES),
+    max_retries=config.EMBEDDING_MAX_RETRIES,
+    cache=embedding_cache if config.EMBEDDING_CACHE_ENABLED else None,
+)
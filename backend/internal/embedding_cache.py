@@ -0,0 +1,148 @@
+import hashlib
+import sys
+import unicodedata
+from array import array
+from datetime import datetime
+
+from sqlalchemy import delete, func, tuple_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+
+from bootstrap.config import config
+from bootstrap.db import AsyncSessionLocal
+from models.embedding_cache import EmbeddingCacheEntry
+
+_QUERY_BATCH = 1000  # Keys per IN (...) clause
+
+
+def normalize_chunk_text(text: str) -> str:
+    """NFC-normalizes and collapses whitespace so trivial edits still hit."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(normalize_chunk_text(text).encode("utf-8")).hexdigest()
+
+
+def pack_vector(vector: list[float]) -> bytes:
+    packed = array("f", vector)
+    if sys.byteorder == "big":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_vector(blob: bytes) -> list[float]:
+    unpacked = array("f")
+    unpacked.frombytes(blob)
+    if sys.byteorder == "big":
+        unpacked.byteswap()
+    return unpacked.tolist()
+
+
+class EmbeddingCache:
+    """Persistent (model, chunk hash) -> float32 vector cache with LRU eviction.
+
+    Entries live in the `embedding_cache` table; `last_used_at` is bumped on
+    every hit and the least recently used rows are deleted once the table
+    grows past `max_entries`.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get_many(self, model: str, hashes: list[str]) -> dict[str, list[float]]:
+        found: dict[str, list[float]] = {}
+        if not hashes:
+            return found
+
+        unique_hashes = list(dict.fromkeys(hashes))
+        async with AsyncSessionLocal() as db:
+            for i in range(0, len(unique_hashes), _QUERY_BATCH):
+                batch = unique_hashes[i : i + _QUERY_BATCH]
+                result = await db.execute(
+                    select(EmbeddingCacheEntry.text_hash, EmbeddingCacheEntry.vector).where(
+                        EmbeddingCacheEntry.model == model,
+                        EmbeddingCacheEntry.text_hash.in_(batch),
+                    )
+                )
+                for text_hash, blob in result.all():
+                    found[text_hash] = unpack_vector(blob)
+
+            if found:
+                hit_hashes = list(found)
+                for i in range(0, len(hit_hashes), _QUERY_BATCH):
+                    await db.execute(
+                        update(EmbeddingCacheEntry)
+                        .where(
+                            EmbeddingCacheEntry.model == model,
+                            EmbeddingCacheEntry.text_hash.in_(hit_hashes[i : i + _QUERY_BATCH]),
+                        )
+                        .values(last_used_at=datetime.utcnow())
+                    )
+                await db.commit()
+
+        self.hits += len(found)
+        self.misses += len(unique_hashes) - len(found)
+        return found
+
+    async def put_many(self, model: str, vectors: dict[str, list[float]]):
+        if not vectors:
+            return
+
+        now = datetime.utcnow()
+        rows = [
+            {
+                "model": model,
+                "text_hash": text_hash,
+                "dim": len(vector),
+                "vector": pack_vector(vector),
+                "created_at": now,
+                "last_used_at": now,
+            }
+            for text_hash, vector in vectors.items()
+        ]
+        async with AsyncSessionLocal() as db:
+            for i in range(0, len(rows), _QUERY_BATCH):
+                await db.execute(
+                    insert(EmbeddingCacheEntry)
+                    .values(rows[i : i + _QUERY_BATCH])
+                    .on_conflict_do_nothing()
+                )
+            await self._evict(db)
+            await db.commit()
+
+    async def _evict(self, db):
+        total = (
+            await db.execute(select(func.count()).select_from(EmbeddingCacheEntry))
+        ).scalar_one()
+        overflow = total - self.max_entries
+        if overflow <= 0:
+            return
+
+        oldest = (
+            select(EmbeddingCacheEntry.model, EmbeddingCacheEntry.text_hash)
+            .order_by(EmbeddingCacheEntry.last_used_at)
+            .limit(overflow)
+        )
+        await db.execute(
+            delete(EmbeddingCacheEntry).where(
+                tuple_(EmbeddingCacheEntry.model, EmbeddingCacheEntry.text_hash).in_(oldest)
+            )
+        )
+        self.evictions += overflow
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "max_entries": self.max_entries,
+        }
+
+
+embedding_cache = EmbeddingCache(max_entries=config.EMBEDDING_CACHE_MAX_ENTRIES)
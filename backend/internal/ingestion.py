@@ -0,0 +1,570 @@
+import asyncio
+import os
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Optional
+
+import httpx
+import requests
+from fastapi.concurrency import run_in_threadpool
+from qdrant_client import AsyncQdrantClient, models as qdrant_models
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.future import select
+
+from bootstrap.config import config
+from bootstrap.db import AsyncSessionLocal
+from bootstrap.qdrant import get_qdrant
+from internal.blob_store import blob_store
+from internal.chunking import PAGE_SEPARATOR, Chunk, chunk_pages
+from internal.embedding import RETRYABLE_ERRORS as RETRYABLE_OPENAI_ERRORS, embedder
+from internal.embedding_cache import chunk_hash
+from internal.qdrant_registry import qdrant_registry
+from internal import qdrant_store
+from internal.qdrant_store import ensure_qdrant_collection, qdrant_collection_name
+from internal.readers.ocr_client import OCRServiceUnavailableError
+from internal.readers.thuann_reader import PAGE_SOURCE_OCR, ThuaNNPdfReader
+from models.collection import Collection
+from models.file import File as FileModel
+from models.ingestion_job import IngestionJob, IngestionJobStatus, IngestionStage
+
+# Share of the overall progress reached when each stage starts
+_STAGE_PROGRESS = {
+    IngestionStage.PARSE: 0.0,
+    IngestionStage.CHUNK: 0.4,
+    IngestionStage.EMBED: 0.45,
+    IngestionStage.UPSERT: 0.9,
+}
+
+
+class IngestionError(Exception):
+    """Raised by a pipeline stage when the job cannot continue."""
+
+
+class JobOwnershipLost(IngestionError):
+    """Raised when the job was removed or reclaimed by another worker mid-run."""
+
+
+def is_transient_error(e: BaseException) -> bool:
+    """Whether retrying the job later may succeed (timeouts, 429/5xx, unreachable services)."""
+    if isinstance(e, IngestionError):
+        return False
+    if isinstance(e, UnexpectedResponse):
+        return e.status_code == 429 or e.status_code >= 500
+    if isinstance(e, requests.HTTPError):
+        return e.response is not None and e.response.status_code >= 500
+    return isinstance(
+        e,
+        (
+            asyncio.TimeoutError,
+            ConnectionError,
+            httpx.TransportError,
+            ResponseHandlingException,
+            requests.ConnectionError,
+            requests.Timeout,
+            OCRServiceUnavailableError,
+            RETRYABLE_OPENAI_ERRORS,
+        ),
+    )
+
+
+# --- Helper Functions for Embedding ---
+
+
+# Namespace of the deterministic point ids (see chunk_point_ids)
+POINT_ID_NAMESPACE = uuid.UUID("5b0b7f3e-2c1d-4f6a-9f0e-8d3c4a1b2e71")
+UPSERT_BATCH_SIZE = 256  # Points per Qdrant upsert request
+
+
+def chunk_point_ids(file_id: uuid.UUID, chunks: list[Chunk]) -> list[str]:
+    """Deterministic point id of each chunk, derived from the file (whose id is
+    kept when its content is replaced), the chunk's content hash and, for
+    repeated chunks, which repeat it is. Unchanged chunks of a revised file
+    therefore map to the points already stored for them."""
+    seen: Counter = Counter()
+    point_ids = []
+    for chunk in chunks:
+        digest = chunk_hash(chunk.text)
+        point_ids.append(
+            str(uuid.uuid5(POINT_ID_NAMESPACE, f"{file_id}:{digest}:{seen[digest]}"))
+        )
+        seen[digest] += 1
+    return point_ids
+
+
+def chunk_payload(
+    collection_id: uuid.UUID, file_id: uuid.UUID, file_name: str, sequence: int, chunk: Chunk
+) -> dict:
+    return {
+        "text": chunk.text,
+        "collection_id": str(collection_id),
+        "file_id": str(file_id),
+        "file_name": file_name,
+        "chunk_sequence": sequence,
+        "start": chunk.start,
+        "end": chunk.end,
+        "page": chunk.page,
+    }
+
+
+async def store_chunks_in_qdrant(
+    qdrant_client: AsyncQdrantClient,
+    qdrant_collection_name: str,
+    collection_id: uuid.UUID,
+    file_id: uuid.UUID,
+    file_name: str,
+    chunks: list[Chunk],
+    point_ids: list[str],
+    embeddings: dict[str, list[float]],
+    existing: dict[str, dict],
+) -> dict:
+    """Brings the file's points in Qdrant in line with `chunks`.
+
+    Chunks with an entry in `embeddings` (keyed by point id) are upserted;
+    the others are already stored and only get their payload rewritten when
+    their position or metadata changed. Points in `existing` that no chunk
+    maps to anymore are deleted. Returns the count of each operation.
+    """
+    new_points = []
+    payload_updates = []
+    for sequence, (chunk, point_id) in enumerate(zip(chunks, point_ids)):
+        payload = chunk_payload(collection_id, file_id, file_name, sequence, chunk)
+        if point_id in embeddings:
+            new_points.append(
+                qdrant_models.PointStruct(id=point_id, payload=payload, vector=embeddings[point_id])
+            )
+        elif existing.get(point_id) != payload:
+            payload_updates.append(
+                qdrant_models.SetPayloadOperation(
+                    set_payload=qdrant_models.SetPayload(payload=payload, points=[point_id])
+                )
+            )
+    kept = set(point_ids)
+    stale = [point_id for point_id in existing if point_id not in kept]
+
+    # New points go in before stale ones are removed, so searches never see the file empty
+    for i in range(0, len(new_points), UPSERT_BATCH_SIZE):
+        await qdrant_client.upsert(
+            collection_name=qdrant_collection_name,
+            points=new_points[i : i + UPSERT_BATCH_SIZE],
+        )
+    for i in range(0, len(payload_updates), UPSERT_BATCH_SIZE):
+        await qdrant_client.batch_update_points(
+            collection_name=qdrant_collection_name,
+            update_operations=payload_updates[i : i + UPSERT_BATCH_SIZE],
+        )
+    if stale:
+        await qdrant_client.delete(
+            collection_name=qdrant_collection_name,
+            points_selector=qdrant_models.PointIdsList(points=stale),
+        )
+    qdrant_registry.add_points(qdrant_collection_name, len(new_points) - len(stale))
+    print(
+        f"Qdrant collection '{qdrant_collection_name}', file '{file_name}': "
+        f"{len(new_points)} upserted, {len(payload_updates)} payloads updated, {len(stale)} deleted."
+    )
+    return {
+        "upserted": len(new_points),
+        "payload_updated": len(payload_updates),
+        "deleted": len(stale),
+    }
+
+
+def make_preview(text: str) -> str:
+    return text[:200] + "..." if len(text) > 200 else text
+
+
+# --- Job bookkeeping ---
+
+
+async def count_pending_jobs(db) -> int:
+    result = await db.execute(
+        select(func.count())
+        .select_from(IngestionJob)
+        .where(IngestionJob.status == IngestionJobStatus.QUEUED)
+    )
+    return result.scalar_one()
+
+
+async def _update_job(job_id: uuid.UUID, attempt: Optional[int] = None, **fields) -> bool:
+    """Updates a job row in its own transaction and refreshes its heartbeat.
+
+    With `attempt`, the update only happens while that attempt still owns the
+    job (RUNNING with the same attempt number), so a run whose lease expired
+    cannot overwrite the run that reclaimed it. Returns False if nothing was
+    updated.
+    """
+    async with AsyncSessionLocal() as db:
+        job = await db.get(IngestionJob, job_id, with_for_update=attempt is not None)
+        if job is None:
+            return False
+        if attempt is not None and (
+            job.attempts != attempt or job.status != IngestionJobStatus.RUNNING
+        ):
+            return False
+        for field, value in fields.items():
+            setattr(job, field, value)
+        job.updated_at = datetime.utcnow()
+        await db.commit()
+        return True
+
+
+async def _set_stage(job_id: uuid.UUID, attempt: int, stage: IngestionStage, **fields):
+    if not await _update_job(
+        job_id, attempt, stage=stage.value, progress=_STAGE_PROGRESS[stage], **fields
+    ):
+        raise JobOwnershipLost("Job was removed or reclaimed while running (file deleted?).")
+
+
+async def _file_exists(file_id: uuid.UUID) -> bool:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(FileModel.id).where(FileModel.id == file_id))
+        return result.scalar_one_or_none() is not None
+
+
+async def _remove_points_of_deleted_file(
+    qdrant_client: AsyncQdrantClient,
+    qdrant_collection_name: str,
+    collection_id: uuid.UUID,
+    file_id: uuid.UUID,
+) -> bool:
+    """Deletes the file's points if the file row is gone. Returns whether it was.
+
+    The delete endpoint removes the points present when it runs; an upsert that
+    was still in flight can land after that, so the job cleans up after itself.
+    """
+    if await _file_exists(file_id):
+        return False
+    try:
+        await qdrant_client.delete(
+            collection_name=qdrant_collection_name,
+            points_selector=qdrant_models.FilterSelector(
+                filter=qdrant_store.points_filter(collection_id, file_id)
+            ),
+        )
+    except UnexpectedResponse as e:
+        if e.status_code != 404:  # The whole collection was dropped
+            raise
+    print(f"File {file_id} was deleted during ingestion; removed its points.")
+    return True
+
+
+async def _touch_collection(collection_id: uuid.UUID):
+    """Bumps `updated_at` so retrieval caches keyed on it stop serving old chunks."""
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(Collection)
+            .where(Collection.id == collection_id)
+            .values(updated_at=datetime.utcnow())
+        )
+        await db.commit()
+
+
+# --- Pipeline stages ---
+
+
+async def _parse(file_model: FileModel, details: dict) -> Optional[list[str]]:
+    """Returns the text of each page of the file (a single page for plain text)."""
+    content = await blob_store.read(file_model.content_hash) if file_model.content_hash else b""
+    if file_model.type == "text/plain":
+        try:
+            return [content.decode("utf-8")]
+        except UnicodeDecodeError as e:
+            raise IngestionError(f"Error decoding text file: {e}") from e
+
+    if file_model.type == "application/pdf":
+        print("Using ThuaNNPdfReader to parse PDF content...")
+        pages = await run_in_threadpool(ThuaNNPdfReader().load_pages, content)
+        # Which path (text_layer / ocr) each page took
+        details["pages"] = [{"page": page.number, "source": page.source} for page in pages]
+        details["ocr_pages"] = sum(1 for page in pages if page.source == PAGE_SOURCE_OCR)
+        details["text_layer_pages"] = len(pages) - details["ocr_pages"]
+        return [page.text for page in pages] or None
+
+    # Add more file type handlers here (e.g. DOCX) using appropriate libraries
+    return None
+
+
+async def run_ingestion_job(job_id: uuid.UUID, attempt: int):
+    """Runs the parse -> chunk -> embed -> upsert pipeline for one claimed job."""
+    async with AsyncSessionLocal() as db:
+        job = await db.get(IngestionJob, job_id)
+        file_model = await db.get(FileModel, job.file_id) if job else None
+        if file_model is None:
+            raise IngestionError("File no longer exists.")
+        # Detach so the (possibly large) row does not hold the session open
+        db.expunge(file_model)
+
+    file_name = file_model.name
+    details = {"file_name": file_name}
+
+    # Qdrant always has an address (config.qdrant_url); only the embedding key may be missing
+    if not os.getenv("OPENAI_API_KEY"):
+        print(f"OpenAI API key not set, skipping embedding for file {file_name}.")
+        details["message"] = "Embedding skipped: OpenAI API key not set."
+        return details
+
+    await _set_stage(job_id, attempt, IngestionStage.PARSE)
+    pages = await _parse(file_model, details)
+    if not pages or not any(page.strip() for page in pages):
+        print(f"No valid text content to embed for file '{file_name}'. Skipping embedding.")
+        details["message"] = f"No text extracted from '{file_model.type}' file."
+        # Still continue with no chunks, so points of a replaced version are removed
+        pages = []
+    else:
+        details["preview"] = make_preview(PAGE_SEPARATOR.join(pages))
+
+    await _set_stage(job_id, attempt, IngestionStage.CHUNK, details=details)
+    chunks = chunk_pages(pages)
+    details["chunks"] = len(chunks)
+    details["chunk_strategy"] = config.CHUNK_STRATEGY
+
+    qdrant_client = get_qdrant()
+    target_collection_name = qdrant_collection_name(file_model.collection_id)
+    await ensure_qdrant_collection(qdrant_client, target_collection_name)
+    # Points stored by earlier runs for this file (a replaced version, an interrupted attempt)
+    existing = await qdrant_store.file_point_payloads(
+        qdrant_client, file_model.collection_id, file_model.id
+    )
+    point_ids = chunk_point_ids(file_model.id, chunks)
+    new_indexes = [i for i, point_id in enumerate(point_ids) if point_id not in existing]
+    details["unchanged"] = len(chunks) - len(new_indexes)
+
+    await _set_stage(job_id, attempt, IngestionStage.EMBED, details=details)
+    embed_span = _STAGE_PROGRESS[IngestionStage.UPSERT] - _STAGE_PROGRESS[IngestionStage.EMBED]
+
+    async def report_embed_progress(done: int):
+        await _update_job(
+            job_id,
+            attempt,
+            progress=_STAGE_PROGRESS[IngestionStage.EMBED] + embed_span * done / len(new_indexes),
+        )
+
+    vectors = await embedder.embed(
+        [chunks[i].text for i in new_indexes], on_progress=report_embed_progress
+    )
+    details["embedded"] = len(vectors)
+
+    # Ownership is checked again right before writing: embedding can take long
+    await _set_stage(job_id, attempt, IngestionStage.UPSERT, details=details)
+    try:
+        stored = await store_chunks_in_qdrant(
+            qdrant_client,
+            target_collection_name,
+            file_model.collection_id,
+            file_model.id,
+            file_name,
+            chunks,
+            point_ids,
+            {point_ids[i]: vector for i, vector in zip(new_indexes, vectors)},
+            existing,
+        )
+    except BaseException:
+        # Also when cancelled by the heartbeat after the job row was deleted
+        await _remove_points_of_deleted_file(
+            qdrant_client, target_collection_name, file_model.collection_id, file_model.id
+        )
+        raise
+    if await _remove_points_of_deleted_file(
+        qdrant_client, target_collection_name, file_model.collection_id, file_model.id
+    ):
+        raise JobOwnershipLost("File was deleted while its points were being written.")
+    details.update(stored)
+    if details["upserted"] or details["payload_updated"] or details["deleted"]:
+        await _touch_collection(file_model.collection_id)
+    print(
+        f"File '{file_name}' processed and embedded successfully. Collection: {target_collection_name}"
+    )
+    return details
+
+
+# --- Worker pool ---
+
+
+class IngestionWorkerPool:
+    """In-process pool of workers draining the persistent `ingestion_jobs` queue.
+
+    Jobs are claimed with `SELECT ... FOR UPDATE SKIP LOCKED`, so several pools
+    (one per server process) can share the same table safely.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        poll_interval: float,
+        lease_seconds: int,
+        max_attempts: int,
+    ):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker_loop(i)) for i in range(self.concurrency)
+        ]
+        print(f"Started {self.concurrency} ingestion workers.")
+
+    async def stop(self):
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wakes idle workers up after a job has been enqueued."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _worker_loop(self, worker_index: int):
+        while not self._stopping:
+            try:
+                claimed = await self._claim_next()
+            except Exception as e:
+                print(f"Ingestion worker {worker_index} failed to claim a job: {e}")
+                claimed = None
+
+            if claimed is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(*claimed)
+
+    async def _claim_next(self) -> Optional[tuple[uuid.UUID, int]]:
+        """Claims the oldest runnable job. Returns its id and attempt number."""
+        now = datetime.utcnow()
+        lease_expired_before = now - timedelta(seconds=self.lease_seconds)
+        async with AsyncSessionLocal() as db:
+            stmt = (
+                select(IngestionJob)
+                .where(
+                    or_(
+                        and_(
+                            IngestionJob.status == IngestionJobStatus.QUEUED,
+                            or_(
+                                IngestionJob.available_at.is_(None),
+                                IngestionJob.available_at <= now,
+                            ),
+                        ),
+                        and_(
+                            IngestionJob.status == IngestionJobStatus.RUNNING,
+                            IngestionJob.updated_at < lease_expired_before,
+                        ),
+                    )
+                )
+                .order_by(IngestionJob.created_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            job = (await db.execute(stmt)).scalars().first()
+            if job is None:
+                return None
+
+            if job.attempts >= self.max_attempts:
+                job.status = IngestionJobStatus.FAILED
+                job.error = job.error or "Gave up after too many attempts."
+                job.finished_at = now
+                await db.commit()
+                # Something was in the queue, so look again right away
+                return await self._claim_next()
+
+            job.status = IngestionJobStatus.RUNNING
+            job.attempts += 1
+            job.started_at = now
+            job.updated_at = now
+            job.available_at = None
+            job.error = None
+            await db.commit()
+            return job.id, job.attempts
+
+    async def _heartbeat(self, job_id: uuid.UUID, attempt: int, job_task: asyncio.Task) -> bool:
+        """Refreshes the job's lease every third of it while `job_task` runs.
+        Cancels the run and returns False once the job is no longer ours."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                owned = await _update_job(job_id, attempt)
+            except Exception as e:
+                print(f"Heartbeat of ingestion job {job_id} failed: {e}")
+                continue
+            if not owned:
+                print(f"Ingestion job {job_id} was removed or reclaimed, stopping attempt {attempt}.")
+                job_task.cancel()
+                return False
+
+    def _retry_delay(self, attempt: int) -> float:
+        return min(
+            config.INGESTION_RETRY_BACKOFF_MAX_SECONDS,
+            config.INGESTION_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1),
+        )
+
+    async def _run(self, job_id: uuid.UUID, attempt: int):
+        job_task = asyncio.create_task(run_ingestion_job(job_id, attempt))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, attempt, job_task))
+        try:
+            details = await job_task
+        except asyncio.CancelledError:
+            if heartbeat.done() and not heartbeat.cancelled() and heartbeat.result() is False:
+                return  # Another worker owns the job now
+            raise
+        except JobOwnershipLost as e:
+            print(f"Ingestion job {job_id}: {e}")
+            return
+        except Exception as e:
+            now = datetime.utcnow()
+            if is_transient_error(e) and attempt < self.max_attempts:
+                delay = self._retry_delay(attempt)
+                print(f"Ingestion job {job_id} hit a transient error, retrying in {delay:.0f}s: {e}")
+                await _update_job(
+                    job_id,
+                    attempt,
+                    status=IngestionJobStatus.QUEUED,
+                    stage=None,
+                    error=str(e),
+                    available_at=now + timedelta(seconds=delay),
+                )
+                return
+            print(f"Ingestion job {job_id} failed: {e}")
+            await _update_job(
+                job_id,
+                attempt,
+                status=IngestionJobStatus.FAILED,
+                error=str(e),
+                finished_at=now,
+            )
+            return
+        finally:
+            heartbeat.cancel()
+
+        if not await _update_job(
+            job_id,
+            attempt,
+            status=IngestionJobStatus.SUCCEEDED,
+            stage=None,
+            progress=1.0,
+            details=details,
+            finished_at=datetime.utcnow(),
+        ):
+            print(f"Ingestion job {job_id} attempt {attempt} finished after losing the job; result dropped.")
+
+
+ingestion_pool = IngestionWorkerPool(
+    concurrency=config.INGESTION_WORKERS,
+    poll_interval=config.INGESTION_POLL_INTERVAL_SECONDS,
+    lease_seconds=config.INGESTION_JOB_LEASE_SECONDS,
+    max_attempts=config.INGESTION_MAX_ATTEMPTS,
+)
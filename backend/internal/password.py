@@ -1,16 +1,93 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
 from passlib.context import CryptContext
 
+from bootstrap.config import config
+
+T = TypeVar("T")
+
+# Hashes made with other schemes or fewer rounds are flagged by
+# verify_and_update, so logins upgrade them when the parameters change.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=config.PASSWORD_BCRYPT_ROUNDS,
+)
+
+# bcrypt takes 100+ ms per call; it runs here instead of on the event loop,
+# and at most PASSWORD_HASH_WORKERS calls run at once.
+_executor = ThreadPoolExecutor(
+    max_workers=config.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+
+
+class PasswordHashMetrics:
+    """Call count and duration of each password hashing operation."""
+
+    def __init__(self):
+        self._operations: dict[str, dict] = {}
+
+    def record(self, operation: str, wait_seconds: float, run_seconds: float):
+        stats = self._operations.setdefault(
+            operation,
+            {"calls": 0, "total_seconds": 0.0, "max_seconds": 0.0, "total_wait_seconds": 0.0},
+        )
+        stats["calls"] += 1
+        stats["total_seconds"] += run_seconds
+        stats["max_seconds"] = max(stats["max_seconds"], run_seconds)
+        stats["total_wait_seconds"] += wait_seconds
+
+    def stats(self) -> dict:
+        return {
+            "workers": config.PASSWORD_HASH_WORKERS,
+            "bcrypt_rounds": config.PASSWORD_BCRYPT_ROUNDS,
+            "operations": {
+                operation: {
+                    **stats,
+                    "avg_seconds": stats["total_seconds"] / stats["calls"],
+                    "avg_wait_seconds": stats["total_wait_seconds"] / stats["calls"],
+                }
+                for operation, stats in self._operations.items()
+            },
+        }
+
+
+password_metrics = PasswordHashMetrics()
+
+
+async def _run(operation: str, func: Callable[..., T], *args) -> T:
+    """Runs `func` on the password executor, recording queue wait and run time."""
+    submitted = time.perf_counter()
+    started = submitted
+
+    def timed():
+        nonlocal started
+        started = time.perf_counter()
+        return func(*args)
+
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, timed)
+    finally:
+        finished = time.perf_counter()
+        password_metrics.record(operation, started - submitted, finished - started)
+
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await _run("verify", pwd_context.verify, plain_password, hashed_password)
 
 
-def verify_password(plain_password, hashed_password):
-    print("Verifying password...")
-    print(f"Plain password: {plain_password}")
-    print(f"Hashed password: {hashed_password}")
-    # Check if the hashed password is None or empty
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, Optional[str]]:
+    """Verifies the password and, if its hash uses outdated parameters, also
+    returns a new hash to store (None otherwise)."""
+    return await _run(
+        "verify", pwd_context.verify_and_update, plain_password, hashed_password
+    )
 
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def get_password_hash(password: str) -> str:
+    return await _run("hash", pwd_context.hash, password)
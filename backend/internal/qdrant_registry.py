@@ -0,0 +1,128 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from qdrant_client import AsyncQdrantClient, models as qdrant_models
+from qdrant_client.http.exceptions import UnexpectedResponse
+
+from bootstrap.config import config
+
+_LOAD_CONCURRENCY = 8  # get_collection calls in flight while loading
+
+
+@dataclass
+class QdrantCollectionInfo:
+    name: str
+    exists: bool
+    vector_size: Optional[int] = None
+    points_count: Optional[int] = None
+    checked_at: float = 0.0
+
+
+def _vector_size(info: qdrant_models.CollectionInfo) -> Optional[int]:
+    vectors = info.config.params.vectors
+    # Named vectors come back as a dict; the app only uses the unnamed one
+    return vectors.size if isinstance(vectors, qdrant_models.VectorParams) else None
+
+
+class QdrantCollectionRegistry:
+    """In-process view of which Qdrant collections exist.
+
+    Loaded at startup and kept current by the create/delete helpers in
+    `internal.qdrant_store`, so existence checks are answered from memory.
+    Entries older than `ttl_seconds` are re-checked against Qdrant on the next
+    lookup, which picks up changes made by other processes. A collection found
+    missing is only trusted for `missing_ttl_seconds`, so one created by
+    another process or worker shows up almost immediately.
+    """
+
+    def __init__(self, ttl_seconds: float, missing_ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.missing_ttl_seconds = missing_ttl_seconds
+        self._collections: dict[str, QdrantCollectionInfo] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def load(self, qdrant_client: AsyncQdrantClient):
+        """Registers every collection currently in Qdrant."""
+        response = await qdrant_client.get_collections()
+        semaphore = asyncio.Semaphore(_LOAD_CONCURRENCY)
+
+        async def load_one(name: str):
+            async with semaphore:
+                await self._fetch(qdrant_client, name)
+
+        names = [c.name for c in response.collections]
+        await asyncio.gather(*(load_one(name) for name in names))
+        print(f"Qdrant collection registry loaded {len(names)} collections.")
+
+    async def exists(self, qdrant_client: AsyncQdrantClient, name: str) -> bool:
+        entry = self._collections.get(name)
+        ttl = (self.ttl_seconds if entry.exists else self.missing_ttl_seconds) if entry else 0
+        if entry and time.monotonic() - entry.checked_at < ttl:
+            self.hits += 1
+            return entry.exists
+        self.misses += 1
+        return (await self._fetch(qdrant_client, name)).exists
+
+    async def _fetch(self, qdrant_client: AsyncQdrantClient, name: str) -> QdrantCollectionInfo:
+        try:
+            info = await qdrant_client.get_collection(collection_name=name)
+        except UnexpectedResponse as e:
+            if e.status_code != 404:
+                raise
+            return self.mark_missing(name)
+        return self.record(name, info)
+
+    def record(self, name: str, info: qdrant_models.CollectionInfo) -> QdrantCollectionInfo:
+        """Stores what a get_collection call returned."""
+        entry = QdrantCollectionInfo(
+            name=name,
+            exists=True,
+            vector_size=_vector_size(info),
+            points_count=info.points_count,
+            checked_at=time.monotonic(),
+        )
+        self._collections[name] = entry
+        return entry
+
+    def add(self, name: str, vector_size: int):
+        """Registers a collection this process just created."""
+        self._collections[name] = QdrantCollectionInfo(
+            name=name,
+            exists=True,
+            vector_size=vector_size,
+            points_count=0,
+            checked_at=time.monotonic(),
+        )
+
+    def mark_missing(self, name: str) -> QdrantCollectionInfo:
+        entry = QdrantCollectionInfo(name=name, exists=False, checked_at=time.monotonic())
+        self._collections[name] = entry
+        return entry
+
+    def add_points(self, name: str, count: int):
+        entry = self._collections.get(name)
+        if entry and entry.exists and entry.points_count is not None:
+            entry.points_count += count
+
+    def get(self, name: str) -> Optional[QdrantCollectionInfo]:
+        return self._collections.get(name)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "known_collections": sum(1 for c in self._collections.values() if c.exists),
+            "ttl_seconds": self.ttl_seconds,
+            "missing_ttl_seconds": self.missing_ttl_seconds,
+        }
+
+
+qdrant_registry = QdrantCollectionRegistry(
+    ttl_seconds=config.QDRANT_REGISTRY_TTL_SECONDS,
+    missing_ttl_seconds=config.QDRANT_REGISTRY_MISSING_TTL_SECONDS,
+)
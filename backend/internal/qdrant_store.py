@@ -0,0 +1,219 @@
+import asyncio
+import uuid
+from typing import Optional
+
+from qdrant_client import AsyncQdrantClient, models as qdrant_models
+from qdrant_client.http.exceptions import UnexpectedResponse
+
+from bootstrap.config import config
+from internal.qdrant_registry import qdrant_registry
+
+VECTOR_SIZE = 1536  # For OpenAI's text-embedding-ada-002
+
+STORAGE_MODE_PER_COLLECTION = "per_collection"
+STORAGE_MODE_SHARED = "shared"
+
+# Payload fields filtered on; collection_id only matters (and is indexed) in shared mode
+INDEXED_PAYLOAD_FIELDS = ("collection_id", "file_id")
+
+SCROLL_PAGE_SIZE = 1000
+# Extra facet buckets requested beyond the known file count (points of deleted files, ...)
+FACET_SLACK = 100
+
+
+class QdrantStoreError(Exception):
+    """Raised when the state of a Qdrant collection cannot be determined."""
+
+
+def is_shared_mode() -> bool:
+    return config.QDRANT_STORAGE_MODE == STORAGE_MODE_SHARED
+
+
+def per_collection_name(collection_id: uuid.UUID) -> str:
+    return f"collection_{str(collection_id).replace('-', '_')}"
+
+
+def qdrant_collection_name(collection_id: uuid.UUID) -> str:
+    """Name of the Qdrant collection holding the chunks of `collection_id`."""
+    if is_shared_mode():
+        return config.QDRANT_SHARED_COLLECTION
+    return per_collection_name(collection_id)
+
+
+def points_filter(
+    collection_id: uuid.UUID, file_id: Optional[uuid.UUID] = None
+) -> Optional[qdrant_models.Filter]:
+    """Filter selecting the points of a collection (and optionally one file).
+
+    In per-collection mode the Qdrant collection itself scopes the points, so
+    only the file condition is needed.
+    """
+    must = []
+    if is_shared_mode():
+        must.append(
+            qdrant_models.FieldCondition(
+                key="collection_id",
+                match=qdrant_models.MatchValue(value=str(collection_id)),
+            )
+        )
+    if file_id is not None:
+        must.append(
+            qdrant_models.FieldCondition(
+                key="file_id", match=qdrant_models.MatchValue(value=str(file_id))
+            )
+        )
+    return qdrant_models.Filter(must=must) if must else None
+
+
+def active_collections_filter(collection_ids: list[uuid.UUID]) -> qdrant_models.Filter:
+    return qdrant_models.Filter(
+        must=[
+            qdrant_models.FieldCondition(
+                key="collection_id",
+                match=qdrant_models.MatchAny(any=[str(cid) for cid in collection_ids]),
+            )
+        ]
+    )
+
+
+# One creation at a time per Qdrant collection name within this process
+_create_locks: dict[str, asyncio.Lock] = {}
+
+
+def _is_conflict(e: UnexpectedResponse) -> bool:
+    """Qdrant answers 409 (or 400 on older versions) when something already exists."""
+    return e.status_code == 409 or (
+        e.status_code == 400 and "already exists" in str(e.content or b"").lower()
+    )
+
+
+async def ensure_qdrant_collection(
+    qdrant_client: AsyncQdrantClient, qdrant_collection_name: str
+):
+    """Creates the Qdrant collection (and its payload indexes) if it does not exist yet.
+
+    Safe to call concurrently, also from other processes: a collection or
+    index created by someone else in the meantime counts as success.
+    """
+    try:
+        if await qdrant_registry.exists(qdrant_client, qdrant_collection_name):
+            return
+    except UnexpectedResponse as e:
+        # We can't be sure about the collection's state, so don't try to create it.
+        raise QdrantStoreError(f"Qdrant error checking collection: {e}") from e
+
+    lock = _create_locks.setdefault(qdrant_collection_name, asyncio.Lock())
+    async with lock:
+        # Another task may have created it while we waited for the lock
+        entry = qdrant_registry.get(qdrant_collection_name)
+        if entry and entry.exists:
+            return
+
+        print(f"Qdrant collection '{qdrant_collection_name}' does not exist. Creating it...")
+        try:
+            await qdrant_client.create_collection(
+                collection_name=qdrant_collection_name,
+                vectors_config=qdrant_models.VectorParams(
+                    size=VECTOR_SIZE, distance=qdrant_models.Distance.COSINE
+                ),
+            )
+        except UnexpectedResponse as e:
+            if not _is_conflict(e):
+                raise
+            print(f"Qdrant collection '{qdrant_collection_name}' was created concurrently.")
+
+        for field_name in INDEXED_PAYLOAD_FIELDS:
+            if field_name == "collection_id" and qdrant_collection_name != config.QDRANT_SHARED_COLLECTION:
+                continue
+            try:
+                await qdrant_client.create_payload_index(
+                    collection_name=qdrant_collection_name,
+                    field_name=field_name,
+                    field_schema=qdrant_models.PayloadSchemaType.KEYWORD,
+                )
+            except UnexpectedResponse as e:
+                if not _is_conflict(e):
+                    raise
+        qdrant_registry.add(qdrant_collection_name, VECTOR_SIZE)
+
+
+async def delete_collection_points(qdrant_client: AsyncQdrantClient, collection_id: uuid.UUID):
+    """Removes every chunk of `collection_id` from Qdrant."""
+    if is_shared_mode():
+        await qdrant_client.delete(
+            collection_name=config.QDRANT_SHARED_COLLECTION,
+            points_selector=qdrant_models.FilterSelector(filter=points_filter(collection_id)),
+        )
+    else:
+        await qdrant_client.delete_collection(
+            collection_name=per_collection_name(collection_id),
+        )
+        qdrant_registry.mark_missing(per_collection_name(collection_id))
+
+
+async def count_collection_points(qdrant_client: AsyncQdrantClient, collection_id: uuid.UUID) -> int:
+    response = await qdrant_client.count(
+        collection_name=qdrant_collection_name(collection_id),
+        count_filter=points_filter(collection_id),
+        exact=True,
+    )
+    return response.count
+
+
+async def count_distinct_files(
+    qdrant_client: AsyncQdrantClient, collection_id: uuid.UUID, expected_files: int
+) -> int:
+    """Number of distinct file_ids among the points of a collection.
+
+    Uses a facet query on the indexed file_id payload; collections created
+    before the index existed fall back to paging through the file_id payloads.
+    """
+    name = qdrant_collection_name(collection_id)
+    limit = expected_files + FACET_SLACK
+    try:
+        response = await qdrant_client.facet(
+            collection_name=name,
+            key="file_id",
+            facet_filter=points_filter(collection_id),
+            limit=limit,
+            exact=True,
+        )
+        if len(response.hits) < limit:
+            return len(response.hits)
+    except Exception as e:
+        print(f"Facet on file_id unavailable for '{name}' ({e}), scrolling instead.")
+
+    file_ids = set()
+    offset = None
+    while True:
+        points, offset = await qdrant_client.scroll(
+            collection_name=name,
+            scroll_filter=points_filter(collection_id),
+            limit=SCROLL_PAGE_SIZE,
+            offset=offset,
+            with_payload=["file_id"],
+            with_vectors=False,
+        )
+        file_ids.update(p.payload["file_id"] for p in points if p.payload and "file_id" in p.payload)
+        if offset is None:
+            return len(file_ids)
+
+
+async def file_point_payloads(
+    qdrant_client: AsyncQdrantClient, collection_id: uuid.UUID, file_id: uuid.UUID
+) -> dict[str, dict]:
+    """Payload of every point of a file, keyed by point id."""
+    payloads = {}
+    offset = None
+    while True:
+        points, offset = await qdrant_client.scroll(
+            collection_name=qdrant_collection_name(collection_id),
+            scroll_filter=points_filter(collection_id, file_id),
+            limit=SCROLL_PAGE_SIZE,
+            offset=offset,
+            with_payload=True,
+            with_vectors=False,
+        )
+        payloads.update((str(p.id), p.payload or {}) for p in points)
+        if offset is None:
+            return payloads
@@ -0,0 +1,41 @@
+import numpy as np
+
+# Rows whose y-centers are closer than this (in pixels) are merged, like MeanShift(bandwidth=2)
+ROW_TOLERANCE = 2.0
+
+
+def group_rows(lines, tolerance: float = ROW_TOLERANCE, height_ratio: float = 0.0) -> list[list]:
+    """Groups text-line boxes into rows of text by sorting and sweeping their y-centers.
+
+    `lines` holds `[x1, y1, x2, y2, cx, cy]` boxes. A box joins the current row
+    while its center is within `max(tolerance, height_ratio * row height)` of
+    the row's mean center, otherwise it starts a new row. Rows come back top to
+    bottom with their boxes ordered left to right.
+    """
+    if len(lines) == 0:
+        return []
+
+    boxes = np.asarray(lines, dtype=float)
+    cy = boxes[:, 5]
+    heights = boxes[:, 3] - boxes[:, 1]
+    order = np.argsort(cy, kind="stable")
+
+    rows: list[list[int]] = []
+    row_sum = row_height_sum = 0.0
+    for idx in order:
+        if rows:
+            count = len(rows[-1])
+            row_tolerance = max(tolerance, height_ratio * row_height_sum / count)
+            if cy[idx] - row_sum / count <= row_tolerance:
+                rows[-1].append(idx)
+                row_sum += cy[idx]
+                row_height_sum += heights[idx]
+                continue
+        rows.append([idx])
+        row_sum = cy[idx]
+        row_height_sum = heights[idx]
+
+    return [
+        [lines[i] for i in sorted(sorted(row), key=lambda i: boxes[i, 4])]
+        for row in rows
+    ]
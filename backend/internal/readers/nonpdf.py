@@ -1,10 +1,12 @@
 import os
+import subprocess
 import uuid
 import cv2
 import argparse
-import requests
 import numpy as np
 
+from concurrent.futures import ThreadPoolExecutor
+
 from rich.progress import (
     Progress,
     BarColumn,
@@ -14,19 +16,37 @@ from rich.progress import (
     TimeRemainingColumn,
 )
 from pathlib import Path
+from typing import BinaryIO, Iterator, Optional, Union
 from dotenv import load_dotenv
 from docx import Document
 from docx.shared import Pt
-from operator import itemgetter
-from functools import cmp_to_key
-from sklearn.cluster import MeanShift
 from docx.enum.style import WD_STYLE_TYPE
-from pdf2image import convert_from_bytes
+from pdf2image.exceptions import (
+    PDFInfoNotInstalledError,
+    PDFPageCountError,
+    PopplerNotInstalledError,
+)
+from pdf2image.parsers import parse_buffer_to_pgm, parse_buffer_to_ppm
+
+from .line_grouping import group_rows
+from .ocr_client import textline_client, thuann_client, vietocr_client
 
 CHAR_PER_LINE = 159  # font size 13   line width 1300
 
 load_dotenv()
 
+# Pages rasterized and OCR'd at the same time
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "4"))
+# Most pages one pdftoppm call renders; a worker holds this many page images at once
+OCR_RASTER_BATCH_PAGES = int(os.getenv("OCR_RASTER_BATCH_PAGES", "4"))
+# Page rasterization settings; grayscale pages are a third of the size of RGB ones
+OCR_DPI = int(os.getenv("OCR_DPI", "200"))
+OCR_GRAYSCALE = os.getenv("OCR_GRAYSCALE", "true").lower() in ("1", "true", "yes")
+# Rows also absorb boxes within this fraction of the row's mean box height (0 = fixed 2px)
+LINE_GROUP_HEIGHT_RATIO = float(os.getenv("LINE_GROUP_HEIGHT_RATIO", "0"))
+# Line images sent per VietOCR request
+OCR_RECOGNITION_BATCH_SIZE = int(os.getenv("OCR_RECOGNITION_BATCH_SIZE", "64"))
+
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Convert pdf to docx")
@@ -35,75 +55,102 @@ def parse_args():
     return parser.parse_args()
 
 
-def line_clustering(line_list):
-    y_list = []
-    for line in line_list:
-        y_list.append([line[5]])
-    X = np.array(y_list)
-    clustering = MeanShift(bandwidth=2).fit(X)
-
-    line_dicts = {}
-    for i, label in enumerate(clustering.labels_):
-        if label in line_dicts.keys():
-            line_dicts[label].append(line_list[i])
-        else:
-            line_dicts[label] = [line_list[i]]
-
-    return line_dicts
-
-
 def vietocr(roi):
-    url = os.getenv("PDF_THUANN_URL")
     file_bytes = cv2.imencode(".jpg", roi)[1].tobytes()
     f = {"binary_file": file_bytes}
-    response = requests.post(url, files=f)
-    response = response.json()
+    response = thuann_client.post(files=f)
     return response["predicts"][0][0]
 
 
-def text_reg(imgs):
-    VIETOCR_URL = os.getenv("VIETOCR_URL")
-    f = []
+def _encode_rois(imgs):
+    """JPEG-encodes line images; None if any of them cannot be encoded (e.g. empty crop)."""
+    encoded = []
     for img in imgs:
         try:
-            file_bytes = cv2.imencode(".jpg", img)[1].tobytes()
-        except:
-            return [{"str": ""}]
-        f.append(("binary_files", file_bytes))
+            encoded.append(cv2.imencode(".jpg", img)[1].tobytes())
+        except Exception:
+            return None
+    return encoded
+
 
-    response = requests.post(VIETOCR_URL, files=f)
+def _recognize(encoded_imgs):
+    f = [("binary_files", file_bytes) for file_bytes in encoded_imgs]
+    response = vietocr_client.post(files=f)
     try:
-        response = response.json()
-        # print(response)
         return response["predicts"]
     except Exception as e:
-        # print(imgs)
-        # text_reg(imgs)
         print(response)
-        # pass
-
         raise e
 
 
-def textline_detect(img):
-    TEXTLINE_URL = os.getenv("TEXTLINE_URL")
+def text_reg(imgs):
+    encoded = _encode_rois(imgs)
+    if encoded is None:
+        return [{"str": ""}]
+    return _recognize(encoded)
+
+
+def text_reg_groups(img_groups, batch_size: int = OCR_RECOGNITION_BATCH_SIZE):
+    """Recognizes several groups of line images (rows, or whole pages) in as few
+    `binary_files` requests as possible. Returns one result list per group,
+    the same as calling `text_reg` on each group.
+    """
+    results = [None] * len(img_groups)
+    pending = []  # (group index, encoded images)
+    for idx, imgs in enumerate(img_groups):
+        encoded = _encode_rois(imgs)
+        if encoded is None:
+            results[idx] = [{"str": ""}]
+        else:
+            pending.append((idx, encoded))
+
+    flat = [file_bytes for _, encoded in pending for file_bytes in encoded]
+    predicts = []
+    for i in range(0, len(flat), max(1, batch_size)):
+        predicts.extend(_recognize(flat[i : i + batch_size]))
+
+    offset = 0
+    for idx, encoded in pending:
+        results[idx] = predicts[offset : offset + len(encoded)]
+        offset += len(encoded)
+    return results
+
 
+def textline_detect(img):
     file_bytes = cv2.imencode(".jpg", img)[1].tobytes()
     f = {"binary_file": file_bytes}
     data = {"threshold": 0.5}
 
-    response = requests.post(TEXTLINE_URL, files=f, data=data)
-    response = response.json()
+    response = textline_client.post(files=f, data=data)
 
     return response["predicts"][0]
 
 
-def convert_single(fpath, document, document_page):
-    # fpath = "/mlcv2/WorkingSpace/Personal/hienht/uit_chatbot/data_imgs/fd29bebe-6d2d-40ce-bf2d-b22711c57b76.jpg"
-    # fpath = "/mlcv2/WorkingSpace/Personal/hienht/uit_chatbot/data_imgs/fd20c707-6e49-48e5-a8a9-e15729b77854.jpg"
+def load_image(image) -> np.ndarray:
+    """Returns a grayscale or BGR array for a path, a PIL image or an array."""
+    if isinstance(image, np.ndarray):
+        return image
+    if isinstance(image, (str, Path)):
+        return cv2.imread(str(image))
+    if image.mode == "L":
+        return np.asarray(image)
+    return cv2.cvtColor(np.asarray(image.convert("RGB")), cv2.COLOR_RGB2BGR)
+
+
+def read_pdf_bytes(source: Union[bytes, bytearray, BinaryIO, str, Path]) -> bytes:
+    """Returns the PDF content of raw bytes, a binary buffer or a file path."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, "read"):
+        return source.read()
+    with open(source, "rb") as f:
+        return f.read()
 
-    img = cv2.imread(fpath)
-    imgh, imgw, _ = img.shape
+
+def convert_single(image, document: Optional[Document] = None, document_page: Optional[Document] = None):
+    """OCRs one page image. The docx documents are only filled in when given."""
+    img = load_image(image)
+    imgh, imgw = img.shape[:2]
 
     detect_result = textline_detect(img)
 
@@ -119,42 +166,31 @@ def convert_single(fpath, document, document_page):
         cy = (y1 + y2) / 2
         line_list.append([x1, y1, x2, y2, cx, cy])
 
-    line_dicts = line_clustering(line_list)
-
-    line_group_list = x = [[] for i in range(max(line_dicts.keys()) + 1)]
-    for cluster in line_dicts.keys():
-        for line in line_dicts[cluster]:
-            line_group_list[int(cluster)].append(line)
-
-    line_group_list = sorted(
-        line_group_list, key=cmp_to_key(lambda item1, item2: item1[0][5] - item2[0][5])
-    )
-    for i in range(len(line_group_list)):
-        line_group_list[i] = sorted(line_group_list[i], key=itemgetter(4))
+    line_group_list = group_rows(line_list, height_ratio=LINE_GROUP_HEIGHT_RATIO)
 
     # for cluster in line_group_list:
     #     for line in cluster:
     #         img = cv2.putText(img, str(line_group_list.index(cluster)), (int(line[4]), int(line[5])), cv2.FONT_HERSHEY_SIMPLEX, 1, (0,0,255), 2, cv2.LINE_AA)
     # cv2.imwrite("out.jpg", img)
 
-    font_styles = document.styles
-    font_styles_page = document_page.styles
-    comments_style = "CommentsStyle_%s" % uuid.uuid4()
-    font_charstyle = font_styles.add_style(comments_style, WD_STYLE_TYPE.CHARACTER)
-    font_charstyle = font_styles_page.add_style(comments_style, WD_STYLE_TYPE.CHARACTER)
-    font_object = font_charstyle.font
-    font_object.size = Pt(13)
-    font_object.name = "Times New Roman"
-
-    style = document.styles["Normal"]
-    style_page = document_page.styles["Normal"]
-    style.paragraph_format.line_spacing = 1
-    style_page.paragraph_format.line_spacing = 1
-
-    #
-    docs_page = ""
+    if document is not None:
+        font_styles = document.styles
+        font_styles_page = document_page.styles
+        comments_style = "CommentsStyle_%s" % uuid.uuid4()
+        font_charstyle = font_styles.add_style(comments_style, WD_STYLE_TYPE.CHARACTER)
+        font_charstyle = font_styles_page.add_style(comments_style, WD_STYLE_TYPE.CHARACTER)
+        font_object = font_charstyle.font
+        font_object.size = Pt(13)
+        font_object.name = "Times New Roman"
+
+        style = document.styles["Normal"]
+        style_page = document_page.styles["Normal"]
+        style.paragraph_format.line_spacing = 1
+        style_page.paragraph_format.line_spacing = 1
+
+    # Crop every line first so the whole page is recognized in batched requests
+    rows = []
     for cluster in line_group_list:
-        sentence = ""
         latest_roi_width = 0
         roi_list = []
         for i, line in enumerate(cluster):
@@ -172,85 +208,172 @@ def convert_single(fpath, document, document_page):
                 tmp_sentence = " " * (space_num)
 
             roi_list.append(roi)
+        rows.append((roi_list, tmp_sentence))
+
+    reg_results = text_reg_groups([roi_list for roi_list, _ in rows])
 
-        reg_result_list = text_reg(roi_list)
+    docs_page = ""
+    for (_, tmp_sentence), reg_result_list in zip(rows, reg_results):
+        sentence = ""
         for reg_result in reg_result_list:
             text = reg_result["str"]
             tmp_sentence += "%s" % text
             sentence += tmp_sentence
-            latest_roi_width = x2
-        parag = document.add_paragraph()
-        parag_page = document_page.add_paragraph()
-        parag.style = "Body Text"
-        parag_page.style = "Body Text"
-        parag.add_run(sentence, style=comments_style)
-        parag_page.add_run(sentence, style=comments_style)
-        docs_page += "\n" + parag.text.strip(" ")
+        if document is not None:
+            parag = document.add_paragraph()
+            parag_page = document_page.add_paragraph()
+            parag.style = "Body Text"
+            parag_page.style = "Body Text"
+            parag.add_run(sentence, style=comments_style)
+            parag_page.add_run(sentence, style=comments_style)
+        docs_page += "\n" + sentence.strip(" ")
 
     return docs_page
 
 
-def convert(fpath):
-    file_name = Path(fpath).name
-    imgpaths = []
-    imgs = convert_from_bytes(open(fpath, "rb").read())
-    for img in imgs:
-        fname = uuid.uuid4()
-        fpath = "data_imgs/%s.jpg" % fname
-        if not os.path.exists("data_imgs"):
-            os.makedirs("data_imgs")
-        img.save(fpath, "JPEG")
-        imgpaths.append(fpath)
-
-    document = Document()
-    documents_return: list[str] = []
-
-    with Progress(
+def _progress():
+    return Progress(
         TextColumn("[progress.description]{task.description}"),
         BarColumn(),
         TaskProgressColumn(),
         TimeElapsedColumn(),
         TimeRemainingColumn(),
-    ) as progress:
-        task = progress.add_task("Reading images ...", total=len(imgpaths))
-        for idx, imgpath in enumerate(imgpaths):
-            print("Processing image:", imgpath)
-            document_page = Document()
-            docs_page = convert_single(imgpath, document, document_page)
+    )
+
+
+def _run_poppler(command: list[str], pdf_bytes: bytes) -> subprocess.CompletedProcess:
+    """Runs a poppler tool with the PDF on stdin ("-"), so it is never written to disk."""
+    try:
+        return subprocess.run(command + ["-"], input=pdf_bytes, capture_output=True)
+    except OSError as e:
+        raise PopplerNotInstalledError(
+            f"Unable to run {command[0]}. Is poppler installed and in PATH?"
+        ) from e
+
+
+def page_count(pdf_bytes: bytes) -> int:
+    try:
+        result = _run_poppler(["pdfinfo"], pdf_bytes)
+    except PopplerNotInstalledError as e:
+        raise PDFInfoNotInstalledError(str(e)) from e
+    for line in result.stdout.decode("utf8", "ignore").splitlines():
+        key, _, value = line.partition(":")
+        if key == "Pages":
+            return int(value.strip())
+    raise PDFPageCountError(
+        f"Unable to get page count.\n{result.stderr.decode('utf8', 'ignore')}"
+    )
+
+
+def rasterize_pages(
+    pdf_bytes: bytes,
+    first_page: int,
+    last_page: int,
+    dpi: int = OCR_DPI,
+    grayscale: bool = OCR_GRAYSCALE,
+) -> list[np.ndarray]:
+    """Renders pages first_page..last_page (1-based, inclusive) with a single
+    pdftoppm call, reading the PDF from stdin and the images from stdout."""
+    command = ["pdftoppm", "-r", str(dpi), "-f", str(first_page), "-l", str(last_page)]
+    if grayscale:
+        command.append("-gray")
+    result = _run_poppler(command, pdf_bytes)
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"pdftoppm failed on pages {first_page}-{last_page}: "
+            f"{result.stderr.decode('utf8', 'ignore')}"
+        )
+    parse = parse_buffer_to_pgm if grayscale else parse_buffer_to_ppm
+    return [load_image(page_img) for page_img in parse(result.stdout)]
+
+
+def page_batches(
+    page_numbers: list[int], workers: int, max_pages: int = OCR_RASTER_BATCH_PAGES
+) -> list[range]:
+    """Splits page numbers into runs of consecutive pages, each rendered by one
+    pdftoppm call. Runs are small enough that every worker gets one."""
+    page_numbers = list(page_numbers)
+    size = max(1, min(max_pages, -(-len(page_numbers) // max(1, workers))))
+    batches: list[range] = []
+    start = None
+    for i, page_number in enumerate(page_numbers):
+        if start is None:
+            start = page_number
+        next_page = page_numbers[i + 1] if i + 1 < len(page_numbers) else None
+        if next_page != page_number + 1 or page_number - start + 1 == size:
+            batches.append(range(start, page_number + 1))
+            start = None
+    return batches
+
+
+def iter_convert_pages(
+    pdf_bytes: bytes,
+    workers: int = OCR_WORKERS,
+    page_numbers: Optional[list[int]] = None,
+) -> Iterator[str]:
+    """OCRs the pages of a PDF in parallel and yields their text in page order.
+
+    Pages are split into batches of consecutive pages (see `page_batches`);
+    each worker renders a batch with one pdftoppm call fed from memory and
+    OCRs its pages, so at most `workers` batches of page images are alive at
+    once. Pages are yielded as soon as their batch and every batch before it
+    are done. `page_numbers` (1-based) restricts the run to those pages.
+    """
+    if page_numbers is None:
+        page_numbers = range(1, page_count(pdf_bytes) + 1)
+
+    def convert_batch(batch: range) -> list[str]:
+        images = rasterize_pages(pdf_bytes, batch.start, batch.stop - 1)
+        if len(images) != len(batch):
+            raise RuntimeError(
+                f"pdftoppm returned {len(images)} images for pages {batch.start}-{batch.stop - 1}."
+            )
+        texts = []
+        while images:
+            # Drop each page image as soon as it is OCR'd
+            texts.append(convert_single(images.pop(0)))
+        return texts
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        # map() keeps input order and yields each result as it becomes available
+        for texts in executor.map(convert_batch, page_batches(page_numbers, workers)):
+            yield from texts
+
+
+def convert(
+    source: Union[bytes, BinaryIO, str, Path], page_numbers: Optional[list[int]] = None
+):
+    pdf_bytes = read_pdf_bytes(source)
+    if page_numbers is None:
+        page_numbers = list(range(1, page_count(pdf_bytes) + 1))
+    page_count = len(page_numbers)
+
+    documents_return: list[str] = []
+
+    with _progress() as progress:
+        task = progress.add_task("Reading images ...", total=page_count)
+        for idx, docs_page in enumerate(
+            iter_convert_pages(pdf_bytes, page_numbers=page_numbers)
+        ):
             documents_return.append(docs_page)
-            os.remove(imgpath)
             progress.update(
-                task, advance=1, description=f"Processed: {idx + 1}/{len(imgpaths)}"
+                task, advance=1, description=f"Processed: {idx + 1}/{page_count}"
             )
 
-    # document.save(file_out)
-    # return document
     return documents_return
 
 
-def convert_imgs(imgpaths: list[str]):
-    document = Document()
-
+def convert_imgs(imgpaths: list[str], workers: int = OCR_WORKERS):
     documents_return: list[str] = []
 
-    with Progress(
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        TaskProgressColumn(),
-        TimeElapsedColumn(),
-        TimeRemainingColumn(),
-    ) as progress:
+    with _progress() as progress, ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
         task = progress.add_task("Reading images ...", total=len(imgpaths))
-        for idx, imgpath in enumerate(imgpaths):
-            document_page = Document()
-            docs_page = convert_single(imgpath, document, document_page)
+        for idx, docs_page in enumerate(executor.map(convert_single, imgpaths)):
             documents_return.append(docs_page)
             progress.update(
                 task, advance=1, description=f"Processed: {idx + 1}/{len(imgpaths)}"
             )
 
-    # document.save(file_out)
-    # return document
     return documents_return
 
 
@@ -0,0 +1,106 @@
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+load_dotenv()
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class OCRServiceError(Exception):
+    """Raised when an OCR service cannot be used."""
+
+
+class OCRServiceUnavailableError(OCRServiceError):
+    """Raised when an OCR service keeps failing after all retries."""
+
+
+class OCRServiceClient:
+    """Pooled, rate-limited HTTP client for one OCR service.
+
+    Connections are kept alive in a `requests.Session`, at most
+    `max_concurrency` requests are in flight at once (callers run in OCR
+    worker threads), and connection errors, timeouts and 429/5xx responses
+    are retried with jittered exponential backoff.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        url: Optional[str],
+        max_concurrency: int,
+        connect_timeout: float,
+        read_timeout: float,
+        max_retries: int,
+        backoff_base_seconds: float = 0.5,
+        backoff_max_seconds: float = 10.0,
+    ):
+        self.name = name
+        self.url = url
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def post(self, files, data: Optional[dict] = None) -> dict:
+        """POSTs multipart `files` and returns the decoded JSON body."""
+        if not self.url:
+            raise OCRServiceError(f"{self.name} URL is not configured.")
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                with self._semaphore:
+                    response = self._session.post(
+                        self.url, files=files, data=data, timeout=self.timeout
+                    )
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    response.raise_for_status()
+                    return response.json()
+                error = f"HTTP {response.status_code}"
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+
+            if attempt == self.max_retries:
+                break
+            delay = min(self.backoff_max_seconds, self.backoff_base_seconds * 2**attempt)
+            delay *= random.uniform(0.5, 1.0)
+            print(
+                f"{self.name} request failed ({error}), retrying in {delay:.1f}s "
+                f"(attempt {attempt + 1}/{self.max_retries})"
+            )
+            time.sleep(delay)
+
+        raise OCRServiceUnavailableError(
+            f"{self.name} request failed after {self.max_retries + 1} attempts: {error}"
+        )
+
+    def close(self):
+        self._session.close()
+
+
+def _make_client(name: str, url_env: str, concurrency_env: str) -> OCRServiceClient:
+    return OCRServiceClient(
+        name=name,
+        url=os.getenv(url_env),
+        max_concurrency=int(os.getenv(concurrency_env, "4")),
+        connect_timeout=float(os.getenv("OCR_CONNECT_TIMEOUT_SECONDS", "5")),
+        read_timeout=float(os.getenv("OCR_READ_TIMEOUT_SECONDS", "60")),
+        max_retries=int(os.getenv("OCR_MAX_RETRIES", "3")),
+    )
+
+
+# One client per service, shared by every OCR worker thread
+textline_client = _make_client("Text-line detection", "TEXTLINE_URL", "TEXTLINE_MAX_CONCURRENCY")
+vietocr_client = _make_client("VietOCR", "VIETOCR_URL", "VIETOCR_MAX_CONCURRENCY")
+thuann_client = _make_client("ThuaNN OCR", "PDF_THUANN_URL", "PDF_THUANN_MAX_CONCURRENCY")
@@ -0,0 +1,56 @@
+import io
+import os
+import re
+from typing import Optional
+
+from dotenv import load_dotenv
+from PyPDF2 import PdfReader
+
+load_dotenv()
+
+TEXT_LAYER_ENABLED = os.getenv("TEXT_LAYER_ENABLED", "true").lower() in ("1", "true", "yes")
+# A page's embedded text is used only if it has at least this many non-space characters...
+TEXT_LAYER_MIN_CHARS = int(os.getenv("TEXT_LAYER_MIN_CHARS", "30"))
+# ...and at least this share of them are letters or digits (broken font encodings are not)
+TEXT_LAYER_MIN_ALNUM_RATIO = float(os.getenv("TEXT_LAYER_MIN_ALNUM_RATIO", "0.6"))
+
+# Glyphs PyPDF2 could not map come out as (cid:123) or U+FFFD
+_UNMAPPED_GLYPH = re.compile(r"\(cid:\d+\)|\ufffd")
+
+
+def is_usable_text(text: Optional[str]) -> bool:
+    """Whether a page's text layer is good enough to skip OCR."""
+    if not text:
+        return False
+    if _UNMAPPED_GLYPH.search(text):
+        return False
+    chars = "".join(text.split())
+    if len(chars) < TEXT_LAYER_MIN_CHARS:
+        return False
+    alnum = sum(1 for c in chars if c.isalnum())
+    return alnum / len(chars) >= TEXT_LAYER_MIN_ALNUM_RATIO
+
+
+def extract_text_layer(pdf_bytes: bytes) -> Optional[list[Optional[str]]]:
+    """Returns each page's embedded text, or None for pages that need OCR.
+
+    Returns None altogether when the PDF cannot be read by PyPDF2 (encrypted,
+    damaged), in which case every page goes to OCR.
+    """
+    try:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        pages = reader.pages
+        page_count = len(pages)
+    except Exception as e:
+        print(f"Could not read the PDF text layer, using OCR for every page: {e}")
+        return None
+
+    texts: list[Optional[str]] = []
+    for page_number in range(page_count):
+        try:
+            text = pages[page_number].extract_text()
+        except Exception as e:
+            print(f"Could not extract text of page {page_number + 1}: {e}")
+            text = None
+        texts.append(text if is_usable_text(text) else None)
+    return texts
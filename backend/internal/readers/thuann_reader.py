@@ -1,8 +1,20 @@
 import sys
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import BinaryIO, Optional, List, Dict, Union
 
-from .nonpdf import convert, convert_imgs
+from .nonpdf import convert, convert_imgs, read_pdf_bytes
+from .text_layer import TEXT_LAYER_ENABLED, extract_text_layer
+
+PAGE_SOURCE_TEXT_LAYER = "text_layer"
+PAGE_SOURCE_OCR = "ocr"
+
+
+@dataclass
+class PdfPage:
+    number: int  # 1-based
+    text: str
+    source: str  # PAGE_SOURCE_TEXT_LAYER or PAGE_SOURCE_OCR
 
 
 class ThuaNNPdfReader:
@@ -10,21 +22,45 @@ class ThuaNNPdfReader:
 
     def load_data(
         self,
-        file: Path,
+        file: Union[Path, bytes, BinaryIO],
         extra_info: Optional[Dict] = None,
         **kwargs,
     ) -> list[str]:
-        """Parse file pdf."""
-        print("Loading data from file:", file)
+        """Parse file pdf. `file` is a path, the PDF bytes or a binary buffer."""
+        return [page.text for page in self.load_pages(file)]
+
+    def load_pages(self, file: Union[Path, bytes, BinaryIO]) -> list[PdfPage]:
+        """Parse file pdf, reading each page's text layer when it is usable and
+        OCR-ing the rest. Every page records which path it took."""
+        if isinstance(file, Path):
+            print("Loading data from file:", file)
+            if file.suffix != ".pdf":
+                raise ValueError(
+                    f"Unsupported file type: {file.suffix}. Only .pdf files are supported."
+                )
+
+        pdf_bytes = read_pdf_bytes(file)
+        texts = extract_text_layer(pdf_bytes) if TEXT_LAYER_ENABLED else None
+        if texts is None:
+            return [
+                PdfPage(number=i + 1, text=text, source=PAGE_SOURCE_OCR)
+                for i, text in enumerate(convert(pdf_bytes))
+            ]
 
-        if file.suffix == ".pdf":
-            documents = convert(str(file))
-        else:
-            raise ValueError(
-                f"Unsupported file type: {file.suffix}. Only .pdf files are supported."
-            )
+        ocr_numbers = [i + 1 for i, text in enumerate(texts) if text is None]
+        print(
+            f"Text layer usable on {len(texts) - len(ocr_numbers)}/{len(texts)} pages, OCR-ing {len(ocr_numbers)}."
+        )
+        ocr_texts = {}
+        if ocr_numbers:
+            ocr_texts = dict(zip(ocr_numbers, convert(pdf_bytes, page_numbers=ocr_numbers)))
 
-        return documents
+        return [
+            PdfPage(number=i + 1, text=text, source=PAGE_SOURCE_TEXT_LAYER)
+            if text is not None
+            else PdfPage(number=i + 1, text=ocr_texts[i + 1], source=PAGE_SOURCE_OCR)
+            for i, text in enumerate(texts)
+        ]
 
     def load_imgs_data(self, files: list[Path], **kwargs) -> list[str]:
         """Parse image files."""
@@ -0,0 +1,229 @@
+import asyncio
+import hashlib
+import unicodedata
+import uuid
+from dataclasses import dataclass
+from typing import Optional
+
+import openai
+from qdrant_client import AsyncQdrantClient, models as qdrant_models
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from bootstrap.config import config
+from internal.cache import TTLCache
+from internal.qdrant_registry import qdrant_registry
+from internal.qdrant_store import (
+    active_collections_filter,
+    is_shared_mode,
+    qdrant_collection_name,
+)
+from models.collection import Collection
+
+
+@dataclass
+class RetrievedChunk:
+    point_id: str
+    score: float
+    text: str
+    collection_id: uuid.UUID
+    file_id: Optional[str] = None
+
+
+# Level 1: normalized query text -> embedding
+query_embedding_cache = TTLCache(
+    max_entries=config.QUERY_EMBEDDING_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+)
+# Level 2: (query hash, active collection set version) -> retrieved chunks
+retrieval_cache = TTLCache(
+    max_entries=config.RETRIEVAL_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.RETRIEVAL_CACHE_TTL_SECONDS,
+)
+
+
+def normalize_query(text: str) -> str:
+    """NFC, case-folded, collapsed whitespace and no trailing punctuation, so
+    "Học phí bao nhiêu?" and "học phí  bao nhiêu" share cache entries."""
+    return " ".join(unicodedata.normalize("NFC", text).casefold().split()).rstrip(" ?!.")
+
+
+def query_hash(normalized_query: str) -> str:
+    return hashlib.sha256(normalized_query.encode("utf-8")).hexdigest()
+
+
+async def embed_query(text: str) -> list[float]:
+    """Embedding of the normalized `text`, served from the query embedding cache when possible."""
+    normalized = normalize_query(text) or text
+    key = (config.EMBEDDING_MODEL, normalized)
+    vector = query_embedding_cache.get(key)
+    if vector is None:
+        response = await openai.Embedding.acreate(input=[normalized], model=config.EMBEDDING_MODEL)
+        vector = response.data[0].embedding
+        query_embedding_cache.set(key, vector)
+    return vector
+
+
+def collection_set_version(collections: list[tuple[uuid.UUID, object]]) -> str:
+    """Fingerprint of the active collections and their `updated_at`. It changes
+    whenever a collection is (de)activated, deleted, or has files ingested or
+    removed, which makes older retrieval cache entries unreachable."""
+    digest = hashlib.sha256()
+    for collection_id, updated_at in sorted(collections, key=lambda row: str(row[0])):
+        digest.update(f"{collection_id}:{updated_at.isoformat()};".encode("ascii"))
+    return digest.hexdigest()
+
+
+async def _search_collection(
+    qdrant_client: AsyncQdrantClient,
+    collection_id: uuid.UUID,
+    query_vector: list[float],
+    limit: int,
+) -> list[RetrievedChunk]:
+    name = qdrant_collection_name(collection_id)
+    try:
+        # Check if collection exists in Qdrant before searching (answered from the registry)
+        if not await qdrant_registry.exists(qdrant_client, name):
+            print(f"Qdrant collection '{name}' does not exist. Skipping this collection.")
+            return []
+    except Exception as e:
+        print(
+            f"Could not get info for Qdrant collection '{name}'. Qdrant might be unavailable. Error: {e}. Skipping this collection."
+        )
+        return []
+
+    hits = await qdrant_client.search(
+        collection_name=name,
+        query_vector=query_vector,
+        limit=limit,
+    )
+    return _to_chunks(hits, collection_id)
+
+
+def _to_chunks(
+    hits: list[qdrant_models.ScoredPoint], collection_id: Optional[uuid.UUID] = None
+) -> list[RetrievedChunk]:
+    return [
+        RetrievedChunk(
+            point_id=str(hit.id),
+            score=hit.score,
+            text=hit.payload["text"],
+            collection_id=collection_id or uuid.UUID(hit.payload["collection_id"]),
+            file_id=hit.payload.get("file_id"),
+        )
+        for hit in hits
+        if hit.payload and "text" in hit.payload
+    ]
+
+
+async def search_collections(
+    qdrant_client: AsyncQdrantClient,
+    collection_ids: list[uuid.UUID],
+    query_vector: list[float],
+    top_k: int,
+    timeout: float,
+) -> list[RetrievedChunk]:
+    """Searches all collections concurrently and keeps the global top-k by score.
+
+    A collection that errors or does not answer within `timeout` seconds is
+    skipped instead of delaying the whole query.
+    """
+
+    async def search_one(collection_id: uuid.UUID) -> list[RetrievedChunk]:
+        try:
+            return await asyncio.wait_for(
+                _search_collection(qdrant_client, collection_id, query_vector, top_k),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            print(
+                f"Search in Qdrant collection '{qdrant_collection_name(collection_id)}' timed out after {timeout}s. Skipping this collection."
+            )
+        except Exception as e:
+            print(
+                f"Error searching Qdrant collection '{qdrant_collection_name(collection_id)}': {e}. Skipping this collection."
+            )
+        return []
+
+    results = await asyncio.gather(*(search_one(cid) for cid in collection_ids))
+    merged = [chunk for chunks in results for chunk in chunks]
+    merged.sort(key=lambda chunk: chunk.score, reverse=True)
+    return merged[:top_k]
+
+
+async def search_shared_collection(
+    qdrant_client: AsyncQdrantClient,
+    collection_ids: list[uuid.UUID],
+    query_vector: list[float],
+    top_k: int,
+    timeout: float,
+) -> list[RetrievedChunk]:
+    """One filtered search over the shared collection, restricted to the active set."""
+    try:
+        hits = await asyncio.wait_for(
+            qdrant_client.search(
+                collection_name=config.QDRANT_SHARED_COLLECTION,
+                query_vector=query_vector,
+                query_filter=active_collections_filter(collection_ids),
+                limit=top_k,
+            ),
+            timeout,
+        )
+    except asyncio.TimeoutError:
+        print(f"Search in shared Qdrant collection timed out after {timeout}s.")
+        return []
+    except Exception as e:
+        print(f"Error searching shared Qdrant collection '{config.QDRANT_SHARED_COLLECTION}': {e}.")
+        return []
+    return _to_chunks(hits)
+
+
+async def retrieve_context(
+    db: AsyncSession, qdrant_client: AsyncQdrantClient, query: str
+) -> list[RetrievedChunk]:
+    """Returns the chunks most relevant to `query` across all active collections."""
+    active_collections_result = await db.execute(
+        select(Collection.id, Collection.updated_at).where(Collection.is_active == True)
+    )
+    active_collections = active_collections_result.all()
+
+    if not active_collections:
+        print("No active collections found. Skipping RAG.")
+        return []
+
+    cache_key = (
+        query_hash(normalize_query(query) or query),
+        collection_set_version(active_collections),
+        config.RAG_TOP_K,
+    )
+    cached = retrieval_cache.get(cache_key)
+    if cached is not None:
+        return list(cached)
+
+    active_collection_ids = [collection_id for collection_id, _ in active_collections]
+    print(
+        f"Found {len(active_collection_ids)} active collections. Querying them for context..."
+    )
+    query_vector = await embed_query(query)
+    search = search_shared_collection if is_shared_mode() else search_collections
+    chunks = await search(
+        qdrant_client,
+        active_collection_ids,
+        query_vector,
+        top_k=config.RAG_TOP_K,
+        timeout=config.RAG_COLLECTION_TIMEOUT_SECONDS,
+    )
+    if chunks:
+        # Empty results may come from a timed-out or unavailable Qdrant; don't pin them
+        retrieval_cache.set(cache_key, chunks)
+    return chunks
+
+
+def format_context(chunks: list[RetrievedChunk]) -> str:
+    if not chunks:
+        return ""
+    return (
+        "\\\\n\\\\n---\\\\nRelevant Information (from active collections):\\\\n"
+        + "\\\\n\\\\n".join(chunk.text for chunk in chunks)
+        + "\\\\n---\\\\n\\\\n"
+    )
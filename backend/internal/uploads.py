@@ -0,0 +1,97 @@
+from typing import Optional
+
+import magic
+from fastapi import HTTPException, UploadFile, status
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from bootstrap.config import config
+from internal.blob_store import BlobTooLargeError, StagedBlob, blob_store
+from internal.respond import respond_http
+
+MIME_SNIFF_BYTES = 8192  # libmagic only needs the first few KB
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES."""
+
+
+async def stage_upload(upload: UploadFile, max_bytes: Optional[int] = None) -> StagedBlob:
+    """Streams an upload into the blob store's staging area, hashing, measuring
+    and keeping the head for MIME sniffing in the same pass.
+
+    Starlette already spooled the body into `upload.file`, so it is read from
+    there directly instead of being copied once more. Raises UploadTooLargeError
+    past `max_bytes`; the caller commits or discards the staged blob.
+    """
+    max_bytes = config.MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    await upload.seek(0)
+    try:
+        return await blob_store.stage(upload.file, max_bytes, MIME_SNIFF_BYTES)
+    except BlobTooLargeError as e:
+        raise UploadTooLargeError(
+            f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit."
+        ) from e
+
+
+def sniff_mime(head: bytes) -> str:
+    try:
+        return magic.from_buffer(head, mime=True)
+    except magic.MagicException as e:
+        print(f"Magic library error: {e}")
+        return "application/octet-stream"
+
+
+def _too_large_message() -> str:
+    return f"File exceeds the {config.MAX_UPLOAD_BYTES // (1024 * 1024)} MB upload limit."
+
+
+class UploadSizeLimitMiddleware:
+    """Caps the size of multipart request bodies before Starlette spools them.
+
+    A declared Content-Length over the cap is rejected right away. Bodies
+    without one (chunked) or with a wrong one are counted while they stream
+    in, and reading stops with a 413 as soon as the cap is passed.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        # Room for multipart boundaries and part headers on top of the file itself
+        max_body_bytes = config.MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+        content_length = headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_body_bytes:
+            response = respond_http(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                status="error",
+                message=_too_large_message(),
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body_bytes:
+                    # Raised inside body parsing; the app's exception handler answers
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=_too_large_message(),
+                    )
+            return message
+
+        await self.app(scope, limited_receive, send)
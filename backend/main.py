@@ -1,4 +1,10 @@
+import asyncio
+import importlib.util
+import os
+
 from bootstrap.app import create_app
+from bootstrap.config import config
+from bootstrap.db import connection_limit, engine, init_db
 
 
 # test
@@ -121,14 +127,79 @@ from bootstrap.app import create_app
 app = create_app()
 
 
-if __name__ == "__main__":
+def usable_cores() -> int:
+    try:
+        # Cores this process may run on (respects CPU pinning / cpusets)
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count(db_connections: int) -> int:
+    """SERVER_WORKERS, else one worker per usable core, as many as the
+    `db_connections` budget can give a full pool to."""
+    per_worker = max(1, config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW)
+    if config.SERVER_WORKERS:
+        if config.SERVER_WORKERS * per_worker > db_connections:
+            print(
+                f"Warning: {config.SERVER_WORKERS} workers x {per_worker} DB connections "
+                f"(DB_POOL_SIZE + DB_MAX_OVERFLOW) exceed the {db_connections} available."
+            )
+        return config.SERVER_WORKERS
+
+    cores = usable_cores()
+    fitting = max(1, db_connections // per_worker)
+    if fitting < cores:
+        print(
+            f"Using {fitting} workers instead of {cores} (one per core): each opens up to "
+            f"{per_worker} DB connections (DB_POOL_SIZE + DB_MAX_OVERFLOW) and "
+            f"{db_connections} are available (SERVER_DB_CONNECTIONS or max_connections)."
+        )
+        return fitting
+    return cores
+
+
+def run_production():
     import uvicorn
 
-    # Run the app with Uvicorn
+    # Tables are created once here instead of by every worker at startup
+    async def prepare_database() -> int:
+        await init_db()
+        limit = config.SERVER_DB_CONNECTIONS or await connection_limit()
+        await engine.dispose()
+        return limit
+
+    workers = worker_count(asyncio.run(prepare_database()))
+    # Inherited by the workers
+    os.environ["DB_CREATE_TABLES_ON_STARTUP"] = "false"
+    os.environ["EMBEDDING_QUOTA_PROCESSES"] = str(workers)  # Split the provider quota
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    print(f"Starting {workers} workers (loop={loop}, http={http}).")
     uvicorn.run(
         "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        workers=1,
+        host=config.SERVER_HOST,
+        port=config.SERVER_PORT,
+        workers=workers,
+        loop=loop,
+        http=http,
+        timeout_keep_alive=config.SERVER_KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=config.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+        proxy_headers=True,
     )
+
+
+if __name__ == "__main__":
+    if config.SERVER_MODE == "production":
+        run_production()
+    else:
+        import uvicorn
+
+        # Run the app with Uvicorn
+        uvicorn.run(
+            "main:app",
+            host=config.SERVER_HOST,
+            port=config.SERVER_PORT,
+            reload=True,
+            workers=1,
+        )
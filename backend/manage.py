@@ -0,0 +1,227 @@
+"""Maintenance commands.
+
+Usage:
+    python manage.py migrate-qdrant-shared [--batch-size 256] [--delete-source]
+    python manage.py migrate-file-blobs [--batch-size 50] [--drop-column]
+    python manage.py migrate-ingestion-jobs
+"""
+
+import argparse
+import asyncio
+import hashlib
+
+from dotenv import load_dotenv
+from qdrant_client import AsyncQdrantClient, models as qdrant_models
+from qdrant_client.http.exceptions import UnexpectedResponse
+from sqlalchemy import text
+from sqlalchemy.future import select
+
+from bootstrap.config import config
+from bootstrap.db import AsyncSessionLocal, engine
+from bootstrap.qdrant import create_qdrant_client
+from internal import qdrant_store
+from internal.blob_store import blob_store
+from models.collection import Collection
+from models.file import File  # noqa: F401  (registers the Collection.files mapper)
+from models.ingestion_job import IngestionJob  # noqa: F401
+
+load_dotenv()
+
+
+async def migrate_qdrant_shared(batch_size: int, delete_source: bool):
+    """Copies every `collection_<uuid>` Qdrant collection into the shared one.
+
+    Point ids, vectors and payloads are kept; `collection_id` is added to the
+    payload. Safe to re-run: points are upserted by id.
+    """
+    qdrant_client = create_qdrant_client()
+    try:
+        await _migrate_qdrant_shared(qdrant_client, batch_size, delete_source)
+    finally:
+        await qdrant_client.close()
+
+
+async def _migrate_qdrant_shared(
+    qdrant_client: AsyncQdrantClient, batch_size: int, delete_source: bool
+):
+    target = config.QDRANT_SHARED_COLLECTION
+    await qdrant_store.ensure_qdrant_collection(qdrant_client, target)
+
+    async with AsyncSessionLocal() as db:
+        collection_ids = (await db.execute(select(Collection.id))).scalars().all()
+
+    for collection_id in collection_ids:
+        source = qdrant_store.per_collection_name(collection_id)
+        try:
+            source_info = await qdrant_client.get_collection(collection_name=source)
+        except UnexpectedResponse as e:
+            if e.status_code == 404:
+                print(f"{source}: no Qdrant collection, skipping.")
+                continue
+            raise
+
+        copied = 0
+        offset = None
+        while True:
+            points, offset = await qdrant_client.scroll(
+                collection_name=source,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            if points:
+                await qdrant_client.upsert(
+                    collection_name=target,
+                    points=[
+                        qdrant_models.PointStruct(
+                            id=point.id,
+                            vector=point.vector,
+                            payload={**(point.payload or {}), "collection_id": str(collection_id)},
+                        )
+                        for point in points
+                    ],
+                    wait=True,
+                )
+                copied += len(points)
+            if offset is None:
+                break
+
+        migrated = (
+            await qdrant_client.count(
+                collection_name=target,
+                count_filter=qdrant_models.Filter(
+                    must=[
+                        qdrant_models.FieldCondition(
+                            key="collection_id",
+                            match=qdrant_models.MatchValue(value=str(collection_id)),
+                        )
+                    ]
+                ),
+                exact=True,
+            )
+        ).count
+        print(
+            f"{source}: copied {copied} points ({source_info.points_count} in source, {migrated} in '{target}')."
+        )
+
+        if delete_source:
+            if migrated >= (source_info.points_count or 0):
+                await qdrant_client.delete_collection(collection_name=source)
+                print(f"{source}: deleted.")
+            else:
+                print(f"{source}: point counts differ, keeping the source collection.")
+
+    print(
+        f"Done. Set QDRANT_STORAGE_MODE=shared to serve collections from '{target}'."
+    )
+
+
+async def migrate_file_blobs(batch_size: int, drop_column: bool):
+    """Moves `files.content` bytes into the blob store and fills `content_hash`.
+
+    Safe to re-run: only rows that still have content and no hash are moved,
+    and blobs are content-addressed.
+    """
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("ALTER TABLE files ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)")
+        )
+        await conn.execute(
+            text("CREATE INDEX IF NOT EXISTS ix_files_content_hash ON files (content_hash)")
+        )
+        has_content = (
+            await conn.execute(
+                text(
+                    "SELECT 1 FROM information_schema.columns "
+                    "WHERE table_name = 'files' AND column_name = 'content'"
+                )
+            )
+        ).first()
+    if not has_content:
+        print("files.content does not exist, nothing to move.")
+        return
+
+    moved = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            rows = (
+                await db.execute(
+                    text(
+                        "SELECT id, content FROM files "
+                        "WHERE content_hash IS NULL AND content IS NOT NULL LIMIT :limit"
+                    ),
+                    {"limit": batch_size},
+                )
+            ).all()
+            if not rows:
+                break
+            for file_id, content in rows:
+                content = bytes(content)
+                sha256 = hashlib.sha256(content).hexdigest()
+                await blob_store.put_bytes(sha256, content)
+                await db.execute(
+                    text("UPDATE files SET content_hash = :hash, content = NULL WHERE id = :id"),
+                    {"hash": sha256, "id": file_id},
+                )
+            await db.commit()
+        moved += len(rows)
+        print(f"Moved {moved} files to the blob store.")
+
+    print(f"Done, {moved} files moved.")
+    if drop_column:
+        async with engine.begin() as conn:
+            await conn.execute(text("ALTER TABLE files DROP COLUMN content"))
+        print("Dropped files.content.")
+
+
+async def migrate_ingestion_jobs():
+    """Adds the `available_at` retry-backoff column to existing ingestion_jobs tables."""
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS available_at TIMESTAMP")
+        )
+    print("ingestion_jobs.available_at is in place.")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Backend maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    qdrant_shared = subparsers.add_parser(
+        "migrate-qdrant-shared",
+        help="Move per-collection Qdrant data into the shared collection",
+    )
+    qdrant_shared.add_argument("--batch-size", type=int, default=256)
+    qdrant_shared.add_argument(
+        "--delete-source",
+        action="store_true",
+        help="Delete each collection_<uuid> once its points are copied",
+    )
+
+    file_blobs = subparsers.add_parser(
+        "migrate-file-blobs",
+        help="Move file bytes out of Postgres into the blob store",
+    )
+    file_blobs.add_argument("--batch-size", type=int, default=50)
+    file_blobs.add_argument(
+        "--drop-column",
+        action="store_true",
+        help="Drop files.content once every row has been moved",
+    )
+
+    subparsers.add_parser(
+        "migrate-ingestion-jobs",
+        help="Add the retry backoff column to ingestion_jobs",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "migrate-qdrant-shared":
+        asyncio.run(migrate_qdrant_shared(args.batch_size, args.delete_source))
+    elif args.command == "migrate-file-blobs":
+        asyncio.run(migrate_file_blobs(args.batch_size, args.drop_column))
+    elif args.command == "migrate-ingestion-jobs":
+        asyncio.run(migrate_ingestion_jobs())
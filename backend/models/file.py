@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, LargeBinary
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -18,14 +18,16 @@ class File(Base):
     name = Column(String, nullable=False)
     type = Column(String, nullable=False)  # E.g., 'pdf', 'txt', 'docx'
     size = Column(Integer, nullable=False)  # Size in bytes
-    content = Column(
-        LargeBinary, nullable=True
-    )  # Content of the file, stored as binary
-    # For simplicity, storing content directly. For large files, consider storing a path or using a blob store.
+    # SHA-256 of the content; the bytes live in the blob store (internal/blob_store.py)
+    content_hash = Column(String(64), nullable=True, index=True)
     # content_preview = Column(Text, nullable=True) # Or store full content if appropriate
     uploaded_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
     collection = relationship("Collection", back_populates="files")
+    # Not loaded on delete: job rows are removed by the delete endpoints / ON DELETE CASCADE
+    ingestion_jobs = relationship(
+        "IngestionJob", back_populates="file", cascade="all, delete-orphan", passive_deletes=True
+    )
 
     def __repr__(self):
         return f"<File(id={self.id}, name='{self.name}', collection_id={self.collection_id})>"
@@ -0,0 +1,63 @@
+import enum
+import uuid
+from datetime import datetime
+
+from sqlalchemy import JSON, Column, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql.sqltypes import Enum as SQLAlchemyEnum
+
+from bootstrap.db import Base
+
+
+class IngestionJobStatus(str, enum.Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    SUCCEEDED = "SUCCEEDED"
+    FAILED = "FAILED"
+
+
+class IngestionStage(str, enum.Enum):
+    PARSE = "parse"
+    CHUNK = "chunk"
+    EMBED = "embed"
+    UPSERT = "upsert"
+
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    file_id = Column(
+        UUID(as_uuid=True), ForeignKey("files.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    collection_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("collections.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    status = Column(
+        SQLAlchemyEnum(IngestionJobStatus, native_enum=False),
+        nullable=False,
+        default=IngestionJobStatus.QUEUED,
+        index=True,
+    )
+    stage = Column(String, nullable=True)  # One of IngestionStage while running
+    progress = Column(Float, nullable=False, default=0.0)  # 0.0 .. 1.0
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    details = Column(JSON, nullable=True)  # Stage counters, content preview, ...
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    # Retry backoff: a QUEUED job is not claimed before this time
+    available_at = Column(DateTime, nullable=True)
+    # Doubles as the worker heartbeat: a RUNNING job whose updated_at is older than
+    # the lease is considered abandoned and can be claimed again.
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    file = relationship("File", back_populates="ingestion_jobs")
+
+    def __repr__(self):
+        return f"<IngestionJob(id={self.id}, file_id={self.file_id}, status='{self.status}')>"
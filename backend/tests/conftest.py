@@ -0,0 +1,25 @@
+import os
+import sys
+from pathlib import Path
+
+# Settings required by bootstrap.config; nothing here connects to them
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("POSTGRES_SERVER", "localhost")
+os.environ.setdefault("POSTGRES_USER", "test")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("POSTGRES_DB", "test")
+
+# Modules import each other from the backend root (e.g. `from internal.cache import ...`)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Register every model, so mappers with string relationships can be configured
+from models import (  # noqa: E402, F401
+    collection,
+    conversation,
+    embedding_cache,
+    file,
+    ingestion_job,
+    message,
+    session,
+    user,
+)
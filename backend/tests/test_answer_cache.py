@@ -0,0 +1,69 @@
+from internal.answer_cache import SemanticAnswerCache, context_fingerprint
+
+FINGERPRINT = context_fingerprint("model", "system prompt", "context")
+
+
+def make_cache(**kwargs) -> SemanticAnswerCache:
+    options = {"max_entries": 10, "ttl_seconds": 60, "threshold": 0.95}
+    options.update(kwargs)
+    return SemanticAnswerCache(**options)
+
+
+def test_similar_query_hits():
+    cache = make_cache()
+    cache.set([1.0, 0.0, 0.0], FINGERPRINT, "answer")
+    # Cosine similarity ~0.995, length does not matter
+    assert cache.get([10.0, 1.0, 0.0], FINGERPRINT) == "answer"
+    assert cache.hits == 1
+
+
+def test_dissimilar_query_misses():
+    cache = make_cache()
+    cache.set([1.0, 0.0, 0.0], FINGERPRINT, "answer")
+    # Cosine similarity ~0.707
+    assert cache.get([1.0, 1.0, 0.0], FINGERPRINT) is None
+    assert cache.misses == 1
+
+
+def test_threshold_is_configurable():
+    cache = make_cache(threshold=0.7)
+    cache.set([1.0, 0.0, 0.0], FINGERPRINT, "answer")
+    assert cache.get([1.0, 1.0, 0.0], FINGERPRINT) == "answer"
+
+
+def test_most_similar_entry_wins():
+    cache = make_cache(threshold=0.5)
+    cache.set([1.0, 0.0], FINGERPRINT, "first")
+    cache.set([0.0, 1.0], FINGERPRINT, "second")
+    assert cache.get([0.2, 1.0], FINGERPRINT) == "second"
+
+
+def test_other_context_misses():
+    cache = make_cache()
+    cache.set([1.0, 0.0], FINGERPRINT, "answer")
+    other = context_fingerprint("model", "system prompt", "other context")
+    assert cache.get([1.0, 0.0], other) is None
+
+
+def test_expired_entry_misses():
+    cache = make_cache(ttl_seconds=0)
+    cache.set([1.0, 0.0], FINGERPRINT, "answer")
+    assert cache.get([1.0, 0.0], FINGERPRINT) is None
+
+
+def test_least_recently_used_is_replaced():
+    cache = make_cache(max_entries=2, threshold=0.99)
+    cache.set([1.0, 0.0, 0.0], FINGERPRINT, "a")
+    cache.set([0.0, 1.0, 0.0], FINGERPRINT, "b")
+    assert cache.get([1.0, 0.0, 0.0], FINGERPRINT) == "a"  # "b" is now the LRU
+    cache.set([0.0, 0.0, 1.0], FINGERPRINT, "c")
+    assert cache.evictions == 1
+    assert cache.get([0.0, 1.0, 0.0], FINGERPRINT) is None
+    assert cache.get([1.0, 0.0, 0.0], FINGERPRINT) == "a"
+    assert cache.get([0.0, 0.0, 1.0], FINGERPRINT) == "c"
+
+
+def test_zero_entries_disables():
+    cache = make_cache(max_entries=0)
+    cache.set([1.0, 0.0], FINGERPRINT, "answer")
+    assert cache.get([1.0, 0.0], FINGERPRINT) is None
@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+import io
+import os
+
+import pytest
+
+from internal.blob_store import (
+    READ_CHUNK_BYTES,
+    BlobTooLargeError,
+    LocalBlobStore,
+    parse_byte_range,
+)
+
+SIZE = 1000
+
+
+@pytest.mark.parametrize(
+    "header",
+    [None, "", "items=0-10", "bytes=0-10,20-30", "bytes=abc-", "bytes=1-x"],
+)
+def test_unusable_header_sends_whole_blob(header):
+    assert parse_byte_range(header, SIZE) is None
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("bytes=0-99", (0, 100)),
+        ("bytes=500-", (500, SIZE)),
+        ("bytes=999-999", (999, SIZE)),
+        ("bytes=900-5000", (900, SIZE)),  # End clamped to the blob
+        ("bytes=-100", (900, SIZE)),  # Suffix: the last 100 bytes
+        ("bytes=-5000", (0, SIZE)),  # Suffix longer than the blob
+    ],
+)
+def test_satisfiable_range(header, expected):
+    assert parse_byte_range(header, SIZE) == expected
+
+
+@pytest.mark.parametrize(
+    "header, size",
+    [
+        ("bytes=1000-", SIZE),
+        ("bytes=1000-1100", SIZE),
+        ("bytes=50-10", SIZE),
+        ("bytes=-0", SIZE),
+        ("bytes=-10", 0),
+    ],
+)
+def test_unsatisfiable_range(header, size):
+    with pytest.raises(ValueError):
+        parse_byte_range(header, size)
+
+
+def stage(store: LocalBlobStore, data: bytes, **kwargs):
+    return asyncio.run(store.stage(io.BytesIO(data), **kwargs))
+
+
+def test_stage_hashes_measures_and_keeps_head(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    data = b"x" * (3 * READ_CHUNK_BYTES // 2)
+    staged = stage(store, data, head_bytes=10)
+    assert staged.sha256 == hashlib.sha256(data).hexdigest()
+    assert staged.size == len(data)
+    assert staged.head == data[:10]
+    assert not asyncio.run(store.exists(staged.sha256))
+
+    assert asyncio.run(store.commit(staged)) is True
+    assert asyncio.run(store.read(staged.sha256)) == data
+
+
+def test_commit_of_stored_content_drops_staged_copy(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    assert asyncio.run(store.commit(stage(store, b"same")))
+    duplicate = stage(store, b"same")
+    assert asyncio.run(store.commit(duplicate)) is False
+    assert not os.path.exists(duplicate.location)
+
+
+def test_stage_over_limit_leaves_nothing_behind(tmp_path):
+    store = LocalBlobStore(str(tmp_path))
+    with pytest.raises(BlobTooLargeError):
+        stage(store, b"x" * 11, max_bytes=10)
+    assert list((tmp_path / ".staging").iterdir()) == []
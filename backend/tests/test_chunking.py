@@ -0,0 +1,86 @@
+import pytest
+
+from bootstrap.config import config
+from internal.chunking import (
+    PAGE_SEPARATOR,
+    chunk_fixed,
+    chunk_pages,
+    chunk_sentences,
+    chunk_tokens,
+    count_tokens,
+)
+
+SENTENCES = " ".join(f"Sentence number {i} is here." for i in range(40))
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(config, "CHUNK_SIZE", 100)
+    monkeypatch.setattr(config, "CHUNK_OVERLAP", 30)
+    monkeypatch.setattr(config, "CHUNK_MAX_TOKENS", 20)
+    monkeypatch.setattr(config, "CHUNK_OVERLAP_TOKENS", 5)
+
+
+def assert_offsets(text, chunks):
+    for chunk in chunks:
+        assert text[chunk.start : chunk.end] == chunk.text
+
+
+def test_fixed_windows_overlap():
+    text = "".join(chr(ord("a") + i % 26) for i in range(250))
+    chunks = chunk_fixed(text)
+    assert [(c.start, c.end) for c in chunks] == [(0, 100), (70, 170), (140, 240), (210, 250)]
+    assert_offsets(text, chunks)
+
+
+def test_sentences_are_kept_whole():
+    chunks = chunk_sentences(SENTENCES)
+    assert len(chunks) > 1
+    assert_offsets(SENTENCES, chunks)
+    for chunk in chunks:
+        assert len(chunk.text) <= config.CHUNK_SIZE
+        assert chunk.text.startswith("Sentence") and chunk.text.endswith("here.")
+
+
+def test_sentences_overlap_with_previous_chunk():
+    chunks = chunk_sentences(SENTENCES)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous.start < chunk.start < previous.end
+
+
+def test_overlong_sentence_is_split_at_words():
+    text = " ".join(["word"] * 100) + "."
+    chunks = chunk_sentences(text)
+    assert len(chunks) > 1
+    assert_offsets(text, chunks)
+    for chunk in chunks:
+        assert len(chunk.text) <= config.CHUNK_SIZE
+        assert chunk.text.startswith("word")
+
+
+def test_token_chunks_fit_the_token_budget():
+    chunks = chunk_tokens(SENTENCES)
+    assert len(chunks) > 1
+    assert_offsets(SENTENCES, chunks)
+    for chunk in chunks:
+        assert count_tokens(chunk.text) <= config.CHUNK_MAX_TOKENS
+
+
+def test_blank_text_has_no_chunks():
+    assert chunk_sentences("  \n\n  ") == []
+    assert chunk_tokens("") == []
+
+
+@pytest.mark.parametrize("strategy", ["fixed", "sentence", "token"])
+def test_chunks_record_the_page_they_start_on(strategy):
+    pages = ["First page text. " * 8, "Second page text. " * 8, "Third page text. " * 8]
+    text = PAGE_SEPARATOR.join(pages)
+    second_start = len(pages[0]) + len(PAGE_SEPARATOR)
+    third_start = second_start + len(pages[1]) + len(PAGE_SEPARATOR)
+
+    chunks = chunk_pages(pages, strategy)
+    assert_offsets(text, chunks)
+    assert {chunk.page for chunk in chunks} == {1, 2, 3}
+    for chunk in chunks:
+        expected = 1 if chunk.start < second_start else 2 if chunk.start < third_start else 3
+        assert chunk.page == expected
@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from benchmarks.line_grouping_bench import synthetic_page
+from internal.readers.line_grouping import group_rows
+
+
+def box(x1, y1, x2, y2):
+    return [x1, y1, x2, y2, (x1 + x2) / 2, (y1 + y2) / 2]
+
+
+def test_empty():
+    assert group_rows([]) == []
+
+
+def test_rows_top_to_bottom_boxes_left_to_right():
+    page = [
+        [box(10, 0, 50, 20), box(60, 1, 90, 21), box(100, 0, 150, 20)],
+        [box(10, 40, 40, 60), box(50, 41, 80, 61)],
+        [box(10, 80, 90, 100)],
+    ]
+    lines = [line for row in page for line in row]
+    random.Random(0).shuffle(lines)
+    assert group_rows(lines) == page
+
+
+def test_tolerance_splits_rows():
+    upper, lower = box(0, 0, 10, 20), box(20, 3, 30, 23)  # Centers 3 px apart
+    assert group_rows([upper, lower]) == [[upper], [lower]]
+    assert group_rows([upper, lower], tolerance=3) == [[upper, lower]]
+
+
+def test_height_ratio_follows_line_height():
+    # A slightly skewed line of tall boxes
+    left, right = box(0, 0, 100, 40), box(110, 8, 200, 48)
+    assert group_rows([left, right]) == [[left], [right]]
+    assert group_rows([left, right], height_ratio=0.5) == [[left, right]]
+
+
+def test_matches_meanshift_on_synthetic_page():
+    pytest.importorskip("sklearn")
+    from benchmarks.line_grouping_bench import meanshift_rows
+
+    lines = synthetic_page(rows=30, boxes_per_row=5, seed=1)
+    assert group_rows(lines) == meanshift_rows(lines)
@@ -0,0 +1,29 @@
+import pytest
+
+import main
+from bootstrap.config import config
+
+
+@pytest.fixture(autouse=True)
+def sixteen_cores(monkeypatch):
+    monkeypatch.setattr(main, "usable_cores", lambda: 16)
+    monkeypatch.setattr(config, "SERVER_WORKERS", None)
+    monkeypatch.setattr(config, "DB_POOL_SIZE", 10)
+    monkeypatch.setattr(config, "DB_MAX_OVERFLOW", 10)
+
+
+def test_one_worker_per_core():
+    assert main.worker_count(db_connections=1000) == 16
+
+
+def test_fewer_workers_when_db_connections_run_out():
+    assert main.worker_count(db_connections=97) == 4
+
+
+def test_at_least_one_worker():
+    assert main.worker_count(db_connections=5) == 1
+
+
+def test_explicit_worker_count_wins(monkeypatch):
+    monkeypatch.setattr(config, "SERVER_WORKERS", 8)
+    assert main.worker_count(db_connections=20) == 8
@@ -0,0 +1,41 @@
+import pytest
+
+from internal.readers.nonpdf import page_batches
+
+
+def test_batches_are_spread_across_workers():
+    assert page_batches(range(1, 9), workers=4, max_pages=4) == [
+        range(1, 3),
+        range(3, 5),
+        range(5, 7),
+        range(7, 9),
+    ]
+
+
+def test_batches_are_capped():
+    assert page_batches(range(1, 11), workers=2, max_pages=3) == [
+        range(1, 4),
+        range(4, 7),
+        range(7, 10),
+        range(10, 11),
+    ]
+
+
+def test_batches_only_hold_consecutive_pages():
+    assert page_batches([1, 2, 3, 7, 9, 10], workers=1, max_pages=4) == [
+        range(1, 4),
+        range(7, 8),
+        range(9, 11),
+    ]
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_every_page_is_in_one_batch(workers):
+    pages = [2, 3, 4, 5, 6, 11, 12, 20]
+    batches = page_batches(pages, workers=workers, max_pages=3)
+    assert [page for batch in batches for page in batch] == pages
+    assert all(len(batch) <= 3 for batch in batches)
+
+
+def test_no_pages():
+    assert page_batches([], workers=4) == []
@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+from internal.embedding import TokenBucket
+
+
+def timed_acquire(bucket: TokenBucket, amount: float) -> float:
+    started = time.monotonic()
+    asyncio.run(bucket.acquire(amount))
+    return time.monotonic() - started
+
+
+def test_starts_full():
+    bucket = TokenBucket(rate_per_minute=600)
+    assert timed_acquire(bucket, 600) < 0.05
+
+
+def test_waits_for_refill_once_drained():
+    bucket = TokenBucket(rate_per_minute=600)  # 10 tokens per second
+    asyncio.run(bucket.acquire(600))
+    assert timed_acquire(bucket, 2) >= 0.15
+
+
+def test_refills_with_elapsed_time():
+    bucket = TokenBucket(rate_per_minute=600)
+    asyncio.run(bucket.acquire(600))
+    bucket._updated_at -= 3  # 3 seconds ago: 30 tokens
+    bucket._refill()
+    assert 30 <= bucket._tokens < 31
+
+
+def test_refill_is_capped_at_capacity():
+    bucket = TokenBucket(rate_per_minute=600, capacity=50)
+    asyncio.run(bucket.acquire(50))
+    bucket._updated_at -= 3600
+    bucket._refill()
+    assert bucket._tokens == 50
+
+
+def test_request_larger_than_capacity_is_clamped():
+    bucket = TokenBucket(rate_per_minute=600, capacity=5)
+    assert timed_acquire(bucket, 50) < 0.05
+    assert bucket._tokens < 1
@@ -0,0 +1,81 @@
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from bootstrap.config import config
+from internal.uploads import MULTIPART_OVERHEAD_BYTES, UploadSizeLimitMiddleware
+
+BOUNDARY = "test-boundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+@pytest.fixture
+def uploads():
+    return []  # Sizes of the uploads that reached the endpoint
+
+
+@pytest.fixture
+def client(monkeypatch, uploads):
+    monkeypatch.setattr(config, "MAX_UPLOAD_BYTES", 1024)
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        uploads.append(len(await file.read()))
+        return {"size": uploads[-1]}
+
+    return TestClient(app)
+
+
+def multipart_body(size: int) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="file"; filename="a.bin"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + b"x" * size + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def chunked(body: bytes, chunk_size: int = 4096):
+    # A generator body is sent chunked, without Content-Length
+    for i in range(0, len(body), chunk_size):
+        yield body[i : i + chunk_size]
+
+
+def test_small_upload_passes(client):
+    response = client.post(
+        "/upload", content=chunked(multipart_body(1000)), headers={"content-type": CONTENT_TYPE}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"size": 1000}
+
+
+def test_declared_content_length_over_cap_is_rejected(client):
+    response = client.post(
+        "/upload",
+        content=multipart_body(MULTIPART_OVERHEAD_BYTES + 2048),
+        headers={"content-type": CONTENT_TYPE},
+    )
+    assert response.status_code == 413
+
+
+def test_body_without_content_length_is_cut_off(client, uploads):
+    response = client.post(
+        "/upload",
+        content=chunked(multipart_body(MULTIPART_OVERHEAD_BYTES * 4)),
+        headers={"content-type": CONTENT_TYPE},
+    )
+    assert "content-length" not in response.request.headers
+    assert response.status_code == 413
+    assert uploads == []
+
+
+def test_wrong_content_length_is_not_trusted(client, uploads):
+    body = multipart_body(MULTIPART_OVERHEAD_BYTES + 2048)
+    response = client.post(
+        "/upload",
+        content=chunked(body),
+        headers={"content-type": CONTENT_TYPE, "content-length": "100"},
+    )
+    assert response.status_code == 413
+    assert uploads == []
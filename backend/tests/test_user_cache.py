@@ -0,0 +1,104 @@
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from api.middleware.jwt_auth import (
+    get_current_user,
+    invalidate_cached_user,
+    snapshot_user,
+    user_cache,
+)
+from internal.token import create_access_token
+from models.user import User, UserRole
+
+
+class FakeResult:
+    def __init__(self, user):
+        self.user = user
+
+    def scalars(self):
+        return self
+
+    def first(self):
+        return self.user
+
+
+class FakeSession:
+    """Answers every query with the current `user`, counting the queries."""
+
+    def __init__(self, user):
+        self.user = user
+        self.queries = 0
+
+    async def execute(self, statement):
+        self.queries += 1
+        return FakeResult(self.user)
+
+
+def make_user(**fields) -> User:
+    values = {
+        "id": uuid.uuid4(),
+        "username": "alice",
+        "user_fullname": "Alice",
+        "user_email": "alice@example.com",
+        "hashed_password": "hash",
+        "user_role": UserRole.USER,
+        "disabled": False,
+    }
+    values.update(fields)
+    return User(**values)
+
+
+@pytest.fixture(autouse=True)
+def empty_user_cache():
+    user_cache.clear()
+    yield
+    user_cache.clear()
+
+
+def authenticate(user: User, db: FakeSession) -> User:
+    token, _ = create_access_token({"sub": user.username, "uid": str(user.id)})
+    return asyncio.run(get_current_user(token=token, db=db))
+
+
+def test_snapshot_copies_columns():
+    user = make_user()
+    snapshot = snapshot_user(user)
+    assert snapshot is not user
+    assert (snapshot.id, snapshot.username, snapshot.user_role) == (
+        user.id,
+        user.username,
+        user.user_role,
+    )
+
+
+def test_user_is_loaded_once():
+    user = make_user()
+    db = FakeSession(user)
+    assert authenticate(user, db).id == user.id
+    assert authenticate(user, db).id == user.id
+    assert db.queries == 1
+
+
+def test_invalidation_reloads_changes():
+    user = make_user()
+    db = FakeSession(user)
+    authenticate(user, db)
+
+    db.user = make_user(id=user.id, disabled=True)
+    authenticate(user, db)  # Still served from the cache
+    invalidate_cached_user(user.id)
+    with pytest.raises(HTTPException) as e:
+        authenticate(user, db)
+    assert e.value.detail == "Inactive user"
+    assert db.queries == 2
+
+
+def test_unknown_user_is_not_cached():
+    user = make_user()
+    db = FakeSession(None)
+    with pytest.raises(HTTPException):
+        authenticate(user, db)
+    assert user_cache.get(user.id) is None
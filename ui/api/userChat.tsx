@@ -20,6 +20,65 @@ export const postCreateChat = async (values: InCreateChatPOSTRequest, token: str
     return data;
 }
 
+// Streams the bot answer over Server-Sent Events. `onToken` is called with every
+// generated piece of text; the resolved value is the final saved conversation turn.
+export const postCreateChatStream = async (
+    values: InCreateChatPOSTRequest,
+    token: string,
+    onToken: (content: string) => void,
+): Promise<InCreateChatPOSTResponse> => {
+    const response = await fetch(Endpoints.createChatStream, {
+        method: "POST",
+        headers: {
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream",
+            "Authorization": `Bearer ${token}`,
+        },
+        body: JSON.stringify(values),
+    });
+
+    if (!response.ok || !response.body) {
+        throw new Error("Failed to create chat");
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+    let result: InCreateChatPOSTResponse | null = null;
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let separatorIndex;
+        while ((separatorIndex = buffer.indexOf("\n\n")) !== -1) {
+            const rawEvent = buffer.slice(0, separatorIndex);
+            buffer = buffer.slice(separatorIndex + 2);
+
+            let event = "message";
+            let data = "";
+            for (const line of rawEvent.split("\n")) {
+                if (line.startsWith("event:")) event = line.slice(6).trim();
+                else if (line.startsWith("data:")) data += line.slice(5).trim();
+            }
+            if (!data) continue;
+
+            const payload = JSON.parse(data);
+            if (event === "token") {
+                onToken(payload.content);
+            } else if (event === "done") {
+                result = payload as InCreateChatPOSTResponse;
+            }
+        }
+    }
+
+    if (!result) {
+        throw new Error("Chat stream ended unexpectedly");
+    }
+    return result;
+}
+
 export const getListConversations = async (token: string): Promise<InListConversationsGETResponse> => {
     const response = await fetch(Endpoints.getChatID, {
         method: "GET",
@@ -52,6 +111,7 @@ export const getConversation = async (values: InConversationGETRequest, token: s
 
 export const userChatApi = {
     postCreateChat,
+    postCreateChatStream,
     getListConversations,
     getConversation,
 }
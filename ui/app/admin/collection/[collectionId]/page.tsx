@@ -99,6 +99,7 @@ interface ChunkDetail {
 interface ChunkListResponse {
     // Matching backend
     chunks: ChunkDetail[];
+    next_cursor?: string | null;
 }
 
 interface QdrantStatusData {
@@ -132,6 +133,7 @@ export default function CollectionDetailPage() {
     const [selectedFileForChunks, setSelectedFileForChunks] = useState<FileDetail | null>(null);
     const [fileChunks, setFileChunks] = useState<ChunkDetail[]>([]);
     const [loadingChunks, setLoadingChunks] = useState(false);
+    const [chunksCursor, setChunksCursor] = useState<string | null>(null);
     const [isChunkModalOpen, setIsChunkModalOpen] = useState(false);
 
     // New state for delete confirmation
@@ -227,20 +229,18 @@ export default function CollectionDetailPage() {
         setStatsRefreshKey(prevKey => prevKey + 1); // This will trigger all useEffects dependent on it
     };
 
-    const handleViewChunks = async (file: FileDetail) => {
-        setSelectedFileForChunks(file);
-        setIsChunkModalOpen(true);
+    const fetchChunksPage = async (file: FileDetail, cursor: string | null) => {
         setLoadingChunks(true);
-        setFileChunks([]); // Clear previous chunks
         try {
             const refreshToken = getCookie("refresh_token");
-            const response = await fetch(Endpoints.listFileChunks(collectionId, file.id), {
+            const response = await fetch(Endpoints.listFileChunks(collectionId, file.id, cursor), {
                 headers: { Authorization: `Bearer ${refreshToken}` },
             });
             const result: ChunkListResponse = await response.json();
             if (response.ok) {
-                setFileChunks(result.chunks || []);
-                if (!result.chunks || result.chunks.length === 0) {
+                setFileChunks(prev => [...(cursor ? prev : []), ...(result.chunks || [])]);
+                setChunksCursor(result.next_cursor || null);
+                if (!cursor && (!result.chunks || result.chunks.length === 0)) {
                     toast.info("No chunks found for this file in Qdrant.");
                 }
             } else {
@@ -255,6 +255,14 @@ export default function CollectionDetailPage() {
         setLoadingChunks(false);
     };
 
+    const handleViewChunks = async (file: FileDetail) => {
+        setSelectedFileForChunks(file);
+        setIsChunkModalOpen(true);
+        setFileChunks([]); // Clear previous chunks
+        setChunksCursor(null);
+        await fetchChunksPage(file, null);
+    };
+
     // New function to handle file deletion
     const handleDeleteFile = async () => {
         if (!fileToDelete || !collectionId) return;
@@ -511,7 +519,7 @@ export default function CollectionDetailPage() {
                         </DialogDescription>
                     </DialogHeader>
                     <ScrollArea className="flex-grow min-h-0 pr-6 -mr-6"> {/* Added min-h-0 for proper scroll in flex */}
-                        {loadingChunks ? (
+                        {loadingChunks && fileChunks.length === 0 ? (
                              <div className="space-y-2 py-4">
                                 {[...Array(5)].map((_, i) => <Skeleton key={i} className="h-16 w-full" />)}
                             </div>
@@ -530,6 +538,18 @@ export default function CollectionDetailPage() {
                                         </CardContent>
                                     </Card>
                                 ))}
+                                {chunksCursor && selectedFileForChunks && (
+                                    <div className="flex justify-center">
+                                        <Button
+                                            variant="outline"
+                                            size="sm"
+                                            disabled={loadingChunks}
+                                            onClick={() => fetchChunksPage(selectedFileForChunks, chunksCursor)}
+                                        >
+                                            {loadingChunks ? "Loading..." : "Load more"}
+                                        </Button>
+                                    </div>
+                                )}
                             </div>
                         ) : (
                             <p className="text-center text-muted-foreground py-10">
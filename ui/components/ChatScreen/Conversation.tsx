@@ -22,7 +22,7 @@ export function Conversation({ isSidebarCollapsed }: ConversationProps) {
     const [isTyping, setIsTyping] = useState(false)
     const [copiedMessageIndex, setCopiedMessageIndex] = useState<number | null>(null)
     const messagesEndRef = useRef(null);
-    const { createChat, conversation } = useUserChat() // Removed getListConversations as it's not used here
+    const { createChatStream, conversation } = useUserChat() // Removed getListConversations as it's not used here
     const params = useParams(); // Get URL parameters
 
     const currentConversationId = params.conversationID as string || null;
@@ -105,25 +105,28 @@ export function Conversation({ isSidebarCollapsed }: ConversationProps) {
 
         try {
             // Use currentConversationId from URL for the API call
-            let response;
-            if (currentConversationId === "new") {
-                response = await createChat({
-                    message: input.trim(),
-                    conversation_id: null,
-                });
-            } else {
-                response = await createChat({
-                    message: input.trim(),
-                    conversation_id: currentConversationId,
-                });
-            }
+            const conversationId = currentConversationId === "new" ? null : currentConversationId;
 
-            // Add the assistant's response once received
-            const assistantMessage: Message = {
-                sender: "assistant",
-                text: response.bot_message,
-            };
-            setMessages((prev) => [...prev, assistantMessage]);
+            // Stream the assistant's response into a new message as tokens arrive
+            let started = false;
+            await createChatStream(
+                {
+                    message: input.trim(),
+                    conversation_id: conversationId,
+                },
+                (content) => {
+                    if (!started) {
+                        started = true;
+                        setIsTyping(false);
+                        setMessages((prev) => [...prev, { sender: "assistant", text: content }]);
+                        return;
+                    }
+                    setMessages((prev) => {
+                        const last = prev[prev.length - 1];
+                        return [...prev.slice(0, -1), { ...last, text: last.text + content }];
+                    });
+                },
+            );
         } catch (error) {
             console.error("Error sending message:", error);
             // Add an error message if the request fails
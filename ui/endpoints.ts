@@ -3,6 +3,7 @@ export const Endpoints = {
     signup: `${process.env.NEXT_PUBLIC_API_URL}/api/auth/register`,
     me: `${process.env.NEXT_PUBLIC_API_URL}/api/auth/me`,
     createChat: `${process.env.NEXT_PUBLIC_API_URL}/api/conversation/create`,
+    createChatStream: `${process.env.NEXT_PUBLIC_API_URL}/api/conversation/create/stream`,
     getChatID: `${process.env.NEXT_PUBLIC_API_URL}/api/conversation`,
     getChatContent: (conversationId: string) => `${process.env.NEXT_PUBLIC_API_URL}/api/conversation/${conversationId}`,
     updateConversationTitle: (conversationId: string) => `${process.env.NEXT_PUBLIC_API_URL}/api/conversation/${conversationId}`,
@@ -20,7 +21,7 @@ export const Endpoints = {
     uploadFileToCollection: (collectionId: string) => `${process.env.NEXT_PUBLIC_API_URL}/api/collection/${collectionId}/files/upload`,
     getQdrantCollectionStatus: (collectionId: string) => `${process.env.NEXT_PUBLIC_API_URL}/api/collection/${collectionId}/qdrant-status`,
     listFilesForCollection: (collectionId: string) => `${process.env.NEXT_PUBLIC_API_URL}/api/collection/${collectionId}/files`,
-    listFileChunks: (collectionId: string, fileId: string) => `${process.env.NEXT_PUBLIC_API_URL}/api/collection/${collectionId}/files/${fileId}/chunks`,
+    listFileChunks: (collectionId: string, fileId: string, cursor?: string | null) => `${process.env.NEXT_PUBLIC_API_URL}/api/collection/${collectionId}/files/${fileId}/chunks${cursor ? `?cursor=${encodeURIComponent(cursor)}` : ""}`,
     // New endpoint for deleting a file
     deleteFileFromCollection: (collectionId: string, fileId: string) => `${process.env.NEXT_PUBLIC_API_URL}/api/collection/${collectionId}/files/${fileId}`,
 };
@@ -10,6 +10,7 @@ interface UserChatContextType {
     accessToken: string;
     refreshToken: string;
     createChat: (values: InCreateChatPOSTRequest) => Promise<InCreateChatPOSTResponse>;
+    createChatStream: (values: InCreateChatPOSTRequest, onToken: (content: string) => void) => Promise<InCreateChatPOSTResponse>;
     listConversations: () => Promise<InListConversationsGETResponse>;
     conversation: (values: InConversationGETRequest) => Promise<InConversationGETResponse>;
     loading: boolean;
@@ -77,6 +78,20 @@ export const UserChatProvider = ({ children }: AuthProviderProps) => {
         return response;
     };
 
+    const createChatStream = async (
+        values: InCreateChatPOSTRequest,
+        onToken: (content: string) => void,
+    ): Promise<InCreateChatPOSTResponse> => {
+        const response: InCreateChatPOSTResponse = await userChatApi.postCreateChatStream(values, refreshToken.toString(), onToken);
+
+        if (pathname !== "/chat/new") {
+            setConversationID(response.conversation_id);
+            setCookie("conversation_id", response.conversation_id, { maxAge: 60 * 60 * 24 * 30, path: "/" });
+        }
+
+        return response;
+    };
+
     const listConversations = async (): Promise<InListConversationsGETResponse> => {
         const response: InListConversationsGETResponse = await userChatApi.getListConversations(refreshToken.toString());
 
@@ -99,7 +114,7 @@ export const UserChatProvider = ({ children }: AuthProviderProps) => {
 
     return (
         <UserChatContext.Provider
-            value={{ accessToken, refreshToken, createChat, listConversations, conversation, loading }}>
+            value={{ accessToken, refreshToken, createChat, createChatStream, listConversations, conversation, loading }}>
             {children}
         </UserChatContext.Provider>
     );